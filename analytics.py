@@ -0,0 +1,204 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from model import db, Subject, Chapter, Quiz, Score, ChapterScoreHistogram, SubjectDayStat
+from stats import day_of, day_expr, upsert_increments
+
+
+WINDOWS = (('today', 1), ('7d', 7), ('30d', 30))
+PERCENTILES = (50, 90, 99)
+
+
+class ScoreHistogram:
+    """Streaming summary of integer scores.
+
+    Totals are small integers bounded by a quiz's question count, so one
+    counter per distinct score is an exact sketch: constant size per chapter,
+    and any percentile is a walk over a few buckets.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = Counter(counts or {})
+
+    def add(self, score, attempts=1):
+        self.counts[score] += attempts
+
+    @property
+    def attempts(self):
+        return sum(self.counts.values())
+
+    @property
+    def max(self):
+        scores = [score for score, attempts in self.counts.items() if attempts > 0]
+        return max(scores) if scores else None
+
+    @property
+    def mean(self):
+        attempts = self.attempts
+        if not attempts:
+            return None
+        return sum(score * count for score, count in self.counts.items()) / attempts
+
+    def percentile(self, p):
+        attempts = self.attempts
+        if not attempts:
+            return None
+        rank = max(1, -(-p * attempts // 100))
+        seen = 0
+        for score in sorted(self.counts):
+            seen += self.counts[score]
+            if seen >= rank:
+                return score
+        return max(self.counts)
+
+
+def record_scores(rows, lineage):
+    histogram = Counter()
+    days = Counter()
+    for row in rows:
+        if row['quiz_id'] not in lineage:
+            continue
+        chapter_id, subject_id = lineage[row['quiz_id']]
+        histogram[(chapter_id, row['total_scored'])] += 1
+        days[(subject_id, day_of(row['time_stamp_of_attempt']))] += 1
+    apply_deltas(histogram, days)
+
+
+def record_rescores(chapter_id, changes):
+    histogram = Counter()
+    for old_total, new_total in changes:
+        histogram[(chapter_id, old_total)] -= 1
+        histogram[(chapter_id, new_total)] += 1
+    apply_deltas(histogram, {})
+    db.session.execute(delete(ChapterScoreHistogram).where(ChapterScoreHistogram.attempts <= 0))
+
+
+def apply_deltas(histogram, days):
+    upsert_increments(
+        ChapterScoreHistogram,
+        [
+            {'chapter_id': chapter_id, 'total_scored': score, 'attempts': attempts}
+            for (chapter_id, score), attempts in histogram.items()
+        ],
+        ['chapter_id', 'total_scored'],
+        ['attempts'],
+    )
+    upsert_increments(
+        SubjectDayStat,
+        [
+            {'subject_id': subject_id, 'day': day, 'attempts': attempts}
+            for (subject_id, day), attempts in days.items()
+        ],
+        ['subject_id', 'day'],
+        ['attempts'],
+    )
+
+
+def forget_scores(*criteria):
+    histogram = (
+        db.session.query(Quiz.chapter_id, Score.total_scored, func.count(Score.id))
+        .join(Quiz, Score.quiz_id == Quiz.id)
+        .filter(*criteria)
+        .group_by(Quiz.chapter_id, Score.total_scored)
+        .all()
+    )
+    day = day_expr(Score.time_stamp_of_attempt)
+    days = (
+        db.session.query(Chapter.subject_id, day, func.count(Score.id))
+        .join(Quiz, Score.quiz_id == Quiz.id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .filter(*criteria)
+        .group_by(Chapter.subject_id, day)
+        .all()
+    )
+    apply_deltas(
+        {(chapter_id, score): -attempts for chapter_id, score, attempts in histogram},
+        {(subject_id, day): -attempts for subject_id, day, attempts in days},
+    )
+    db.session.execute(delete(ChapterScoreHistogram).where(ChapterScoreHistogram.attempts <= 0))
+    db.session.execute(delete(SubjectDayStat).where(SubjectDayStat.attempts <= 0))
+
+
+def rebuild():
+    db.session.execute(delete(ChapterScoreHistogram))
+    db.session.execute(delete(SubjectDayStat))
+
+    db.session.execute(
+        insert(ChapterScoreHistogram).from_select(
+            ['chapter_id', 'total_scored', 'attempts'],
+            select(Quiz.chapter_id, Score.total_scored, func.count(Score.id))
+            .join(Quiz, Score.quiz_id == Quiz.id)
+            .group_by(Quiz.chapter_id, Score.total_scored)
+        )
+    )
+    day = day_expr(Score.time_stamp_of_attempt)
+    db.session.execute(
+        insert(SubjectDayStat).from_select(
+            ['subject_id', 'day', 'attempts'],
+            select(Chapter.subject_id, day, func.count(Score.id))
+            .join(Quiz, Score.quiz_id == Quiz.id)
+            .join(Chapter, Quiz.chapter_id == Chapter.id)
+            .group_by(Chapter.subject_id, day)
+        )
+    )
+    db.session.commit()
+
+
+def summary(now=None):
+    now = now or datetime.utcnow()
+
+    chapters = {}
+    subject_histograms = defaultdict(ScoreHistogram)
+    rows = (
+        db.session.query(
+            Subject.id, Subject.name, Chapter.id, Chapter.name,
+            ChapterScoreHistogram.total_scored, ChapterScoreHistogram.attempts
+        )
+        .join(Chapter, ChapterScoreHistogram.chapter_id == Chapter.id)
+        .join(Subject, Chapter.subject_id == Subject.id)
+        .order_by(Subject.id, Chapter.id)
+        .all()
+    )
+    subject_names = {}
+    for subject_id, subject_name, chapter_id, chapter_name, score, attempts in rows:
+        subject_names[subject_id] = subject_name
+        if chapter_id not in chapters:
+            chapters[chapter_id] = (chapter_name, ScoreHistogram())
+        chapters[chapter_id][1].add(score, attempts)
+        subject_histograms[subject_id].add(score, attempts)
+
+    oldest = (now - timedelta(days=max(days for _, days in WINDOWS) - 1)).strftime('%Y-%m-%d')
+    windows = defaultdict(lambda: {name: 0 for name, _ in WINDOWS})
+    for subject_id, day, attempts in (
+        db.session.query(SubjectDayStat.subject_id, SubjectDayStat.day, SubjectDayStat.attempts)
+        .filter(SubjectDayStat.day >= oldest)
+        .all()
+    ):
+        for name, days in WINDOWS:
+            if day >= (now - timedelta(days=days - 1)).strftime('%Y-%m-%d'):
+                windows[subject_id][name] += attempts
+
+    def describe(histogram):
+        return {
+            'attempts': histogram.attempts,
+            'max': histogram.max,
+            'mean': round(histogram.mean, 2) if histogram.mean is not None else None,
+            'percentiles': {f'p{p}': histogram.percentile(p) for p in PERCENTILES},
+        }
+
+    subjects = [
+        dict(describe(histogram), name=subject_names[subject_id], windows=windows[subject_id])
+        for subject_id, histogram in subject_histograms.items()
+    ]
+    chapter_stats = [dict(describe(histogram), name=name) for name, histogram in chapters.values()]
+    return {
+        'subjects': [subject['name'] for subject in subjects],
+        'attempts': [subject['attempts'] for subject in subjects],
+        'chapters': [chapter['name'] for chapter in chapter_stats],
+        'top_scores': [chapter['max'] for chapter in chapter_stats],
+        'subject_stats': subjects,
+        'chapter_stats': chapter_stats,
+        'generated_at': now.isoformat(),
+    }
@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Built files live under static/dist, named by content hash, so they can be
+# cached forever; a changed stylesheet gets a new name.
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_strings = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+_comments = re.compile(r'/\*.*?\*/', re.DOTALL)
+_spaces = re.compile(r'\s+')
+_punctuation = re.compile(r'\s*([{};,>])\s*')
+
+_manifest = {}
+
+
+def minify_css(source):
+    # Strings are left exactly as written; only the CSS between them is squeezed.
+    parts = _strings.split(_comments.sub('', source))
+    for i in range(0, len(parts), 2):
+        part = _punctuation.sub(r'\1', _spaces.sub(' ', parts[i]))
+        parts[i] = part.replace(': ', ':').replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def default_bundles(static_folder):
+    # One bundle per page: each template links a single stylesheet, and the
+    # pages reuse class names with different rules, so they can't share one.
+    return {name: [name] for name in sorted(os.listdir(static_folder)) if name.endswith('.css')}
+
+
+def build(static_folder, bundles=None, report=None):
+    """Minify each bundle into static/dist under a content-hash name, with
+    gzip (and brotli, when installed) variants next to it, and write the
+    manifest asset_url() reads. Returns the manifest."""
+    out = os.path.join(static_folder, DIST)
+    os.makedirs(out, exist_ok=True)
+    manifest = {}
+    for name, sources in (bundles or default_bundles(static_folder)).items():
+        css = '\n'.join(
+            minify_css(open(os.path.join(static_folder, source), encoding='utf-8').read()) for source in sources
+        )
+        body = css.encode('utf-8')
+        stem, ext = os.path.splitext(name)
+        hashed = f'{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}'
+        _write(os.path.join(out, hashed), body)
+        _write(os.path.join(out, hashed + '.gz'), gzip.compress(body, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(os.path.join(out, hashed + '.br'), brotli.compress(body, quality=11))
+        manifest[name] = hashed
+        if report:
+            size = sum(os.path.getsize(os.path.join(static_folder, source)) for source in sources)
+            report(f'{name} -> {DIST}/{hashed} ({size} -> {len(body)} bytes)')
+
+    # Written last and atomically, so workers never read a manifest naming files not there yet.
+    _write(os.path.join(out, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    _manifest.clear()
+    _manifest.update(manifest)
+    return manifest
+
+
+def _write(path, data):
+    partial = path + '.tmp'
+    with open(partial, 'wb') as output:
+        output.write(data)
+    os.replace(partial, path)
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST), encoding='utf-8') as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(filename):
+    """url_for('static', filename=...) for the built copy, or the source file until `flask build-assets` has run."""
+    hashed = _manifest.get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('static', filename=f'{DIST}/{hashed}')
+
+
+def serve_built(filename):
+    folder = os.path.join(current_app.static_folder, DIST)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encodings = request.accept_encodings
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in encodings and os.path.exists(os.path.join(folder, filename + suffix)):
+            response = send_from_directory(folder, filename + suffix, mimetype=mimetype, max_age=31536000)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(folder, filename, mimetype=mimetype, max_age=31536000)
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    _manifest.clear()
+    _manifest.update(load_manifest(app.static_folder))
+    app.jinja_env.globals['asset_url'] = asset_url
+    # More specific than the static route, so built files get these headers.
+    app.add_url_rule(f'{app.static_url_path}/{DIST}/<path:filename>', 'built_asset', serve_built)
@@ -0,0 +1,246 @@
+"""Exam-day burst against a synthetic dataset.
+
+Seeds a throwaway database through the models, then has concurrent simulated
+students log in, open a quiz, start it and submit it through the Flask app
+in-process. Reports per-route latency percentiles, throughput and SQL
+statement counts, and writes them as JSON so runs can be compared:
+
+    python -m benchmarks.exam_burst --students 200 --scores 1000000 --json after.json
+    python -m benchmarks.exam_burst --students 200 --compare before.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+PASSWORD = 'bench-password'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subjects', type=int, default=10)
+    parser.add_argument('--chapters', type=int, default=10, help='Chapters per subject.')
+    parser.add_argument('--quizzes', type=int, default=3, help='Quizzes per chapter.')
+    parser.add_argument('--questions', type=int, default=20, help='Questions per quiz.')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--scores', type=int, default=200000, help='Historical Score rows to seed.')
+    parser.add_argument('--students', type=int, default=100, help='Concurrent simulated students.')
+    parser.add_argument('--rounds', type=int, default=3, help='Quizzes each student takes.')
+    parser.add_argument('--hot-quizzes', type=int, default=5, help='Quizzes the burst concentrates on.')
+    parser.add_argument('--database', help='SQLite file to use (default: a temporary file).')
+    parser.add_argument('--reuse', action='store_true', help='Skip seeding an existing --database.')
+    parser.add_argument('--json', help='Write the results to this file.')
+    parser.add_argument('--compare', help='Print the p95 change against an earlier results file.')
+    return parser.parse_args()
+
+
+def seed(args):
+    from sqlalchemy import insert
+
+    import analytics
+    import stats
+    from credentials import credentials
+    from model import db, Subject, Chapter, Quiz, Question, QuestionOption, Score, User
+
+    started = time.perf_counter()
+    db.drop_all()
+    db.create_all()
+    password = credentials.hash(PASSWORD)
+
+    def bulk(model, rows, chunk=50000):
+        for start in range(0, len(rows), chunk):
+            db.session.execute(insert(model), rows[start:start + chunk])
+        db.session.commit()
+
+    bulk(Subject, [{'id': s, 'name': f'Subject {s}', 'description': ''} for s in range(1, args.subjects + 1)])
+    chapter_count = args.subjects * args.chapters
+    bulk(Chapter, [
+        {'id': c, 'subject_id': (c - 1) // args.chapters + 1, 'name': f'Chapter {c}', 'description': ''}
+        for c in range(1, chapter_count + 1)
+    ])
+    quiz_count = chapter_count * args.quizzes
+    bulk(Quiz, [
+        {'id': q, 'chapter_id': (q - 1) // args.quizzes + 1, 'date_of_quiz': date.today(), 'time_duration': '00:30'}
+        for q in range(1, quiz_count + 1)
+    ])
+    question_count = quiz_count * args.questions
+    bulk(Question, [
+        {'id': i, 'quiz_id': (i - 1) // args.questions + 1, 'question_title': f'Q{i}',
+         'question_statement': f'Question {i}?', 'correct_mask': 1 << random.randint(0, 3)}
+        for i in range(1, question_count + 1)
+    ])
+    bulk(QuestionOption, [
+        {'question_id': i, 'position': position, 'text': text}
+        for i in range(1, question_count + 1) for position, text in enumerate('ABCD', 1)
+    ])
+    bulk(User, [
+        {'id': u, 'email': f'student{u}@bench.test', 'password': password, 'fullname': f'Student {u}',
+         'dob': date(2000, 1, 1), 'qualification': 'Bench', 'is_admin': False}
+        for u in range(1, args.users + 1)
+    ])
+    now = datetime.utcnow()
+    for start in range(0, args.scores, 100000):
+        bulk(Score, [
+            {'quiz_id': random.randint(1, quiz_count), 'user_id': random.randint(1, args.users),
+             'time_stamp_of_attempt': now - timedelta(minutes=random.randint(0, 60 * 24 * 365)),
+             'total_scored': random.randint(0, args.questions)}
+            for _ in range(min(100000, args.scores - start))
+        ])
+    stats.rebuild()
+    analytics.rebuild()
+    return quiz_count, time.perf_counter() - started
+
+
+class Recorder:
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statements = defaultdict(int)
+        self.errors = defaultdict(int)
+
+    def on_statement(self, conn, cursor, statement, parameters, context, executemany):
+        route = getattr(self.local, 'route', 'background')
+        with self.lock:
+            self.statements[route] += 1
+
+    def call(self, route, send):
+        self.local.route = route
+        started = time.perf_counter()
+        response = send()
+        elapsed = time.perf_counter() - started
+        self.local.route = 'background'
+        with self.lock:
+            self.latencies[route].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[route] += 1
+        return response
+
+
+def student(app, recorder, user_id, quiz_ids, rounds, barrier):
+    client = app.test_client()
+    barrier.wait()
+    recorder.call('login', lambda: client.post('/login', data={
+        'email': f'student{user_id}@bench.test', 'password': PASSWORD,
+    }))
+    for _ in range(rounds):
+        quiz_id = random.choice(quiz_ids)
+        recorder.call('view_quiz', lambda: client.get(f'/view_quiz/{quiz_id}'))
+        recorder.call('start_quiz', lambda: client.get(f'/start_quiz/{quiz_id}'))
+        payload = recorder.call('quiz_payload', lambda: client.get(f'/api/quiz/{quiz_id}/payload')).get_json()
+        answers = {str(q['id']): [random.randint(1, len(q['options']))] for q in payload['questions']}
+        recorder.call('submit_quiz', lambda: client.post('/submit_quiz', json={'quiz_id': quiz_id, 'answers': answers}))
+    recorder.call('user_dashboard', lambda: client.get('/user_dashboard'))
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else None
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    for route, latencies in sorted(recorder.latencies.items()):
+        routes[route] = {
+            'requests': len(latencies),
+            'errors': recorder.errors[route],
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'sql_per_request': round(recorder.statements[route] / len(latencies), 2),
+        }
+    total = sum(route['requests'] for route in routes.values())
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 1),
+        'background_sql': recorder.statements['background'],
+        'routes': routes,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    directory = tempfile.mkdtemp()
+    database = os.path.abspath(args.database or os.path.join(directory, 'exam_burst.db'))
+    os.environ['DATABASE_URL'] = 'sqlite:///' + database
+
+    from sqlalchemy import event
+
+    from app import create_app
+    from model import db, Quiz
+    from score_writer import score_writer
+
+    app = create_app()
+    with app.app_context():
+        if args.reuse and args.database:
+            quiz_count, seed_s = Quiz.query.count(), 0.0
+        else:
+            quiz_count, seed_s = seed(args)
+        print(f'Seeded {quiz_count} quizzes in {seed_s:.1f}s', file=sys.stderr)
+        engine = db.engine
+
+    recorder = Recorder()
+    event.listen(engine, 'before_cursor_execute', recorder.on_statement)
+    hot = random.sample(range(1, quiz_count + 1), min(args.hot_quizzes, quiz_count))
+    barrier = threading.Barrier(args.students + 1)
+    threads = [
+        threading.Thread(target=student, args=(app, recorder, random.randint(1, args.users), hot, args.rounds, barrier))
+        for _ in range(args.students)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    score_writer.flush()
+    elapsed = time.perf_counter() - started
+    event.remove(engine, 'before_cursor_execute', recorder.on_statement)
+
+    results = {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'parameters': vars(args),
+        'seed_s': round(seed_s, 3),
+        'burst': summarize(recorder, elapsed),
+    }
+
+    burst = results['burst']
+    print(f"{burst['requests']} requests in {burst['elapsed_s']}s ({burst['throughput_rps']} req/s)")
+    print(f"{'route':<16}{'reqs':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'sql/req':>9}")
+    for route, row in burst['routes'].items():
+        print(f"{route:<16}{row['requests']:>7}{row['errors']:>5}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['sql_per_request']:>9}")
+
+    if args.compare:
+        with open(args.compare) as previous_file:
+            previous = json.load(previous_file)['burst']['routes']
+        print(f"\n{'route':<16}{'p95 before':>12}{'p95 after':>12}{'change':>9}")
+        for route, row in burst['routes'].items():
+            if route in previous:
+                before = previous[route]['p95_ms']
+                change = (row['p95_ms'] - before) / before * 100 if before else 0.0
+                print(f"{route:<16}{before:>12}{row['p95_ms']:>12}{change:>+8.1f}%")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
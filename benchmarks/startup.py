@@ -0,0 +1,114 @@
+"""Worker boot time: importing the app module and building an app.
+
+Each sample runs in a fresh interpreter, the way a gunicorn worker or a CLI
+invocation starts, and fails when the median goes over budget or the app
+touched the database while being built:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --import-budget-ms 600 --create-budget-ms 100 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+instance = app.create_app()
+created = time.perf_counter()
+with instance.app_context():
+    pool = app.db.engine.pool
+    connections = pool.checkedin() + pool.checkedout() if hasattr(pool, 'checkedin') else 0
+json.dump({
+    'import_ms': (imported - started) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'connections': connections,
+    'modules': len(sys.modules),
+}, sys.stdout)
+'''
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=750,
+                        help='Median time to import app.py and everything it imports.')
+    parser.add_argument('--create-budget-ms', type=float, default=100, help='Median time for create_app().')
+    parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list.')
+    parser.add_argument('--json', help='Write the results to this file.')
+    return parser.parse_args()
+
+
+def probe(env):
+    output = subprocess.check_output([sys.executable, '-c', PROBE], env=env, text=True)
+    return json.loads(output)
+
+
+def slowest_imports(env, top):
+    # -X importtime reports cumulative microseconds per module, indented two
+    # spaces per level; keep app.py's own imports and those create_app() makes.
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        depth = len(name) - len(name.lstrip())
+        if depth in (1, 3) and name.strip() != 'app':
+            imports.append((int(cumulative) / 1000, name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    args = parse_args()
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(directory, 'startup.db'))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+
+    samples = [probe(env) for _ in range(args.runs)]
+    results = {
+        'runs': args.runs,
+        'import_ms': round(statistics.median(sample['import_ms'] for sample in samples), 1),
+        'create_ms': round(statistics.median(sample['create_ms'] for sample in samples), 1),
+        'connections': max(sample['connections'] for sample in samples),
+        'modules': samples[-1]['modules'],
+        'slowest_imports': [{'module': name, 'ms': round(ms, 1)} for ms, name in slowest_imports(env, args.top)],
+    }
+
+    print(f"import app      {results['import_ms']:>8} ms  (budget {args.import_budget_ms:g})")
+    print(f"create_app()    {results['create_ms']:>8} ms  (budget {args.create_budget_ms:g})")
+    print(f"db connections  {results['connections']:>8}     (budget 0)")
+    print(f"modules loaded  {results['modules']:>8}")
+    print('slowest imports:')
+    for row in results['slowest_imports']:
+        print(f"  {row['module']:<28}{row['ms']:>8} ms")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    over = []
+    if results['import_ms'] > args.import_budget_ms:
+        over.append('import')
+    if results['create_ms'] > args.create_budget_ms:
+        over.append('create_app')
+    if results['connections']:
+        over.append('database access')
+    if over:
+        print(f"Over budget: {', '.join(over)}", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Concurrent read/write throughput of the storage profiles.
+
+Runs reader and writer processes (standing in for gunicorn workers) against a
+fresh database per profile and reports operations per second, tail latency and
+lock errors:
+
+    python -m benchmarks.storage_profiles --seconds 10 --readers 4 --writers 2
+    python -m benchmarks.storage_profiles --postgres-url postgresql://localhost/quiz_bench
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+
+import storage
+from model import db, Subject, Chapter, Quiz, Score, User
+
+
+def build_engine(url, profile):
+    engine = create_engine(url, **storage.engine_options(url, {}))
+    if profile in storage.SQLITE_PROFILES:
+        storage.install_pragmas(engine, storage.sqlite_pragmas(profile))
+    return engine
+
+
+def seed(engine, users, scores):
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Subject), [{'id': 1, 'name': 'Bench'}])
+        conn.execute(insert(Chapter), [{'id': 1, 'subject_id': 1, 'name': 'Bench'}])
+        conn.execute(insert(Quiz), [{'id': 1, 'chapter_id': 1, 'date_of_quiz': date.today(), 'time_duration': '00:30'}])
+        conn.execute(insert(User), [
+            {'id': i, 'email': f'student{i}@bench', 'password': '-', 'fullname': f'Student {i}',
+             'dob': date(2000, 1, 1), 'qualification': '-'}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(insert(Score), [
+            {'quiz_id': 1, 'user_id': random.randint(1, users), 'time_stamp_of_attempt': datetime.utcnow(),
+             'total_scored': random.randint(0, 10)}
+            for _ in range(scores)
+        ])
+
+
+def worker(url, profile, role, users, seconds, results):
+    engine = build_engine(url, profile)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        user_id = random.randint(1, users)
+        started = time.perf_counter()
+        try:
+            if role == 'read':
+                with engine.connect() as conn:
+                    conn.execute(
+                        select(Score.id, Score.total_scored)
+                        .where(Score.user_id == user_id)
+                        .order_by(Score.time_stamp_of_attempt.desc())
+                        .limit(50)
+                    ).fetchall()
+            else:
+                with engine.begin() as conn:
+                    conn.execute(insert(Score), [{
+                        'quiz_id': 1, 'user_id': user_id, 'time_stamp_of_attempt': datetime.utcnow(),
+                        'total_scored': random.randint(0, 10),
+                    }])
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    engine.dispose()
+    results.put((role, latencies, errors))
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run_profile(name, url, profile, args):
+    engine = build_engine(url, profile)
+    seed(engine, args.users, args.scores)
+    engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    roles = ['read'] * args.readers + ['write'] * args.writers
+    processes = [
+        context.Process(target=worker, args=(url, profile, role, args.users, args.seconds, results))
+        for role in roles
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    report = {'profile': name, 'url': url}
+    for role in ('read', 'write'):
+        latencies = [value for kind, values, _ in collected if kind == role for value in values]
+        report[role] = {
+            'ops': len(latencies),
+            'ops_per_sec': round(len(latencies) / args.seconds, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+            'errors': sum(errors for kind, _, errors in collected if kind == role),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--scores', type=int, default=50000)
+    parser.add_argument('--postgres-url', help='Also benchmark this (disposable) PostgreSQL database.')
+    parser.add_argument('--json', help='Write the results to this file.')
+    args = parser.parse_args()
+
+    reports = []
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in storage.SQLITE_PROFILES:
+            url = 'sqlite:///' + os.path.join(directory, f'{profile}.db')
+            reports.append(run_profile(f'sqlite-{profile}', url, profile, args))
+    if args.postgres_url:
+        reports.append(run_profile('postgresql', storage.database_url(args.postgres_url), None, args))
+
+    print(f"{'profile':<20}{'reads/s':>10}{'p99 ms':>10}{'errors':>8}{'writes/s':>10}{'p99 ms':>10}{'errors':>8}")
+    for report in reports:
+        read, write = report['read'], report['write']
+        print(f"{report['profile']:<20}{read['ops_per_sec']:>10}{str(read['p99_ms']):>10}{read['errors']:>8}"
+              f"{write['ops_per_sec']:>10}{str(write['p99_ms']):>10}{write['errors']:>8}")
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(reports, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+import csv
+import io
+import json
+import re
+import time
+from collections import Counter, namedtuple
+from datetime import date, datetime
+from itertools import groupby
+
+from sqlalchemy import func, insert, select
+
+import stats
+from grading import MAX_OPTIONS, compact_options, positions_of
+from model import db, Quiz, Question, QuestionOption, Score
+from quiz_cache import quiz_cache
+from catalog import catalog
+from score_archive import score_archive
+
+
+FORMATS = ('csv', 'jsonl')
+
+# CSV rows spell options out as option1..optionN columns and the correct
+# positions as "1" or "1,3"; JSONL rows may use an "options" list and a
+# "correct" list instead. correct_option is still read, so files in the old
+# four-option layout load unchanged.
+QUESTION_COLUMNS = ('quiz_id', 'question_title', 'question_statement', 'correct')
+REQUIRED_COLUMNS = ('quiz_id', 'question_title', 'question_statement', 'option1', 'option2')
+MAX_TITLE_LENGTH = 200
+MAX_OPTION_LENGTH = 255
+
+# Score.answers is a binary blob tied to the answer key it was graded against,
+# so exports carry the graded totals only.
+EXPORTS = {
+    'quizzes': (Quiz, ('id', 'chapter_id', 'date_of_quiz', 'time_duration', 'remarks')),
+    'questions': (Question, ('id', 'quiz_id', 'question_title', 'question_statement', 'correct_mask')),
+    'scores': (Score, ('id', 'quiz_id', 'user_id', 'time_stamp_of_attempt', 'total_scored')),
+}
+
+ImportResult = namedtuple('ImportResult', 'imported rejected errors quiz_ids seconds')
+
+_separators = re.compile(r'[\s,|;]+')
+
+
+class BulkIOError(ValueError):
+    pass
+
+
+def format_for(filename, default='csv'):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in FORMATS else default
+
+
+def iter_records(lines, fmt):
+    """Yield (line_number, record) pairs without reading the whole file.
+
+    JSONL records are yielded as raw lines and parsed during validation, so a
+    malformed line is rejected like any other bad row.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        fieldnames = reader.fieldnames or ()
+        missing = [column for column in REQUIRED_COLUMNS if column not in fieldnames]
+        if 'correct' not in fieldnames and 'correct_option' not in fieldnames:
+            missing.append('correct')
+        if missing:
+            raise BulkIOError(f"CSV header is missing {', '.join(missing)}")
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(lines, 1):
+            if line.strip():
+                yield line_number, line
+    else:
+        raise BulkIOError(f'Unsupported format {fmt!r}; expected one of {", ".join(FORMATS)}')
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def _positions(value):
+    if value is None:
+        return []
+    if isinstance(value, int):
+        return [value]
+    values = value if isinstance(value, list) else _separators.split(str(value).strip())
+    try:
+        return [int(item) for item in values if item != '']
+    except (TypeError, ValueError):
+        raise ValueError(f'correct {value!r} is not a list of option positions')
+
+
+class QuestionValidator:
+    def __init__(self):
+        self.known_quizzes = {}
+
+    def quiz_exists(self, quiz_id):
+        if quiz_id not in self.known_quizzes:
+            self.known_quizzes[quiz_id] = db.session.get(Quiz, quiz_id) is not None
+        return self.known_quizzes[quiz_id]
+
+    def __call__(self, record):
+        if isinstance(record, str):
+            record = json.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError(f'expected an object, got {type(record).__name__}')
+
+        row = {column: _text(record.get(column)) for column in ('quiz_id', 'question_title', 'question_statement')}
+        for column, value in row.items():
+            if not value:
+                raise ValueError(f'{column} is required')
+        if len(row['question_title']) > MAX_TITLE_LENGTH:
+            raise ValueError(f'question_title is longer than {MAX_TITLE_LENGTH} characters')
+        try:
+            row['quiz_id'] = int(row['quiz_id'])
+        except ValueError:
+            raise ValueError(f"quiz_id {row['quiz_id']!r} is not a number")
+        if not self.quiz_exists(row['quiz_id']):
+            raise ValueError(f"quiz {row['quiz_id']} does not exist")
+
+        texts = record.get('options')
+        if texts is None:
+            texts = []
+            while f'option{len(texts) + 1}' in record:
+                texts.append(record[f'option{len(texts) + 1}'])
+        elif not isinstance(texts, list):
+            raise ValueError('options must be a list')
+        correct = _positions(record['correct'] if 'correct' in record else record.get('correct_option'))
+        options, correct_mask = compact_options([_text(text) for text in texts], correct)
+        if not 2 <= len(options) <= MAX_OPTIONS:
+            raise ValueError(f'a question needs between 2 and {MAX_OPTIONS} options, got {len(options)}')
+        if any(len(text) > MAX_OPTION_LENGTH for text in options):
+            raise ValueError(f'an option is longer than {MAX_OPTION_LENGTH} characters')
+        if not correct or correct_mask.bit_count() != len(set(correct)):
+            raise ValueError(f'correct {correct!r} does not name filled-in options')
+
+        row['correct_mask'] = correct_mask
+        row['options'] = options
+        return row
+
+
+def _insert_chunk(rows):
+    question_ids = db.session.execute(
+        insert(Question).returning(Question.id, sort_by_parameter_order=True),
+        [{key: value for key, value in row.items() if key != 'options'} for row in rows],
+    ).scalars().all()
+    db.session.execute(insert(QuestionOption), [
+        {'question_id': question_id, 'position': position, 'text': text}
+        for question_id, row in zip(question_ids, rows)
+        for position, text in enumerate(row['options'], 1)
+    ])
+    counts = Counter(row['quiz_id'] for row in rows)
+    for quiz_id, count in counts.items():
+        stats.adjust_question_count(quiz_id, count)
+    catalog.bump()
+    db.session.commit()
+    quiz_cache.invalidate(*counts)
+    return counts
+
+
+def import_questions(lines, fmt='csv', chunk_size=1000, max_errors=100, report=None):
+    """Validate and insert questions chunk by chunk, one transaction per chunk.
+
+    Invalid rows are skipped and reported; valid rows around them still load.
+    """
+    started = time.perf_counter()
+    validate = QuestionValidator()
+    imported = rejected = 0
+    errors = []
+    quiz_ids = set()
+    chunk = []
+    for line_number, record in iter_records(lines, fmt):
+        try:
+            chunk.append(validate(record))
+        except ValueError as e:
+            rejected += 1
+            if len(errors) < max_errors:
+                errors.append((line_number, str(e)))
+            continue
+        if len(chunk) >= chunk_size:
+            quiz_ids.update(_insert_chunk(chunk))
+            imported += len(chunk)
+            chunk = []
+            if report is not None:
+                report(f'  {imported} questions imported')
+    if chunk:
+        quiz_ids.update(_insert_chunk(chunk))
+        imported += len(chunk)
+    return ImportResult(imported, rejected, errors, sorted(quiz_ids), time.perf_counter() - started)
+
+
+def _value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _iter_pages(model, columns, quiz_id=None, chunk_size=1000):
+    # Keyset pages on the primary key keep memory flat and each query cheap.
+    query = select(*[getattr(model, column) for column in columns]).order_by(model.id).limit(chunk_size)
+    if quiz_id is not None:
+        query = query.where((model.id if model is Quiz else model.quiz_id) == quiz_id)
+    last_id = 0
+    while True:
+        rows = db.session.execute(query.where(model.id > last_id)).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield [{column: _value(value) for column, value in zip(columns, row)} for row in rows]
+
+
+def _iter_question_pages(quiz_id=None, chunk_size=1000):
+    model, columns = EXPORTS['questions']
+    for page in _iter_pages(model, columns, quiz_id, chunk_size):
+        option_rows = db.session.execute(
+            select(QuestionOption.question_id, QuestionOption.text)
+            .where(QuestionOption.question_id.in_([row['id'] for row in page]))
+            .order_by(QuestionOption.question_id, QuestionOption.position)
+        ).all()
+        options = {
+            question_id: [row.text for row in group]
+            for question_id, group in groupby(option_rows, key=lambda row: row.question_id)
+        }
+        for row in page:
+            row['correct'] = positions_of(row.pop('correct_mask'))
+            row['options'] = options.get(row['id'], [])
+        yield page
+
+
+def _iter_score_pages(quiz_id=None, chunk_size=1000):
+    # Archived months first, then Score; like every other reader, archived
+    # attempts at quizzes deleted since are skipped.
+    model, columns = EXPORTS['scores']
+    quizzes = select(Quiz.id) if quiz_id is None else select(Quiz.id).where(Quiz.id == quiz_id)
+    for page in score_archive.rows(db.session.execute(quizzes).scalars().all(), chunk_size):
+        yield [{column: _value(getattr(row, column)) for column in columns} for row in page]
+    yield from _iter_pages(model, columns, quiz_id, chunk_size)
+
+
+def export_lines(kind, fmt='csv', quiz_id=None, chunk_size=1000):
+    """Return an iterator over the export as text chunks, one per page of rows."""
+    if kind not in EXPORTS:
+        raise BulkIOError(f'Unknown export {kind!r}; expected one of {", ".join(EXPORTS)}')
+    if fmt not in FORMATS:
+        raise BulkIOError(f'Unsupported format {fmt!r}; expected one of {", ".join(FORMATS)}')
+
+    if kind == 'questions':
+        pages = _iter_question_pages(quiz_id, chunk_size)
+        # The widest question decides how many optionN columns the CSV needs.
+        query = select(func.max(QuestionOption.position))
+        if quiz_id is not None:
+            query = query.join(Question, QuestionOption.question_id == Question.id).where(Question.quiz_id == quiz_id)
+        width = max(db.session.execute(query).scalar() or 0, 2)
+        columns = ('id',) + QUESTION_COLUMNS + tuple(f'option{n}' for n in range(1, width + 1))
+    elif kind == 'scores':
+        columns = EXPORTS['scores'][1]
+        pages = _iter_score_pages(quiz_id, chunk_size)
+    else:
+        model, columns = EXPORTS[kind]
+        pages = _iter_pages(model, columns, quiz_id, chunk_size)
+    return _generate_export(pages, columns, fmt)
+
+
+def _csv_row(row, columns):
+    if 'options' in row:
+        row = dict(row, correct=','.join(map(str, row['correct'])))
+        row.update({f'option{n}': text for n, text in enumerate(row.pop('options'), 1)})
+    return ['' if row.get(column) is None else row[column] for column in columns]
+
+
+def _generate_export(pages, columns, fmt):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if fmt == 'csv':
+        writer.writerow(columns)
+    for page in pages:
+        for row in page:
+            if fmt == 'csv':
+                writer.writerow(_csv_row(row, columns))
+            else:
+                buffer.write(json.dumps(row) + '\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import event, func, select
+
+import stats
+from model import db, Subject, Chapter, Quiz, QuizStat, CatalogVersion
+
+
+CatalogSubject = namedtuple('CatalogSubject', 'id name description')
+CatalogChapter = namedtuple('CatalogChapter', 'id subject_id name description')
+CatalogQuiz = namedtuple(
+    'CatalogQuiz', 'id chapter_id chapter_name subject_id subject_name date_of_quiz time_duration remarks num_questions'
+)
+
+
+class Catalog(namedtuple(
+    'Catalog', 'generation scores_generation subjects chapters chapters_by_subject quizzes quizzes_by_id loaded_at'
+)):
+    """Everything the student dashboard and the quiz forms list, as of one generation.
+
+    subjects and quizzes are tuples in id order, chapters and quizzes_by_id map
+    ids to rows and chapters_by_subject maps a subject id to its chapters.
+    """
+    __slots__ = ()
+
+
+def current_version():
+    row = db.session.execute(
+        select(CatalogVersion.generation, CatalogVersion.scores_generation).where(CatalogVersion.id == 1)
+    ).first()
+    return tuple(row) if row is not None else (0, 0)
+
+
+def load_catalog(generation, scores_generation):
+    subjects = tuple(
+        CatalogSubject(*row)
+        for row in db.session.execute(
+            select(Subject.id, Subject.name, Subject.description).order_by(Subject.id)
+        )
+    )
+    chapters = {
+        row.id: CatalogChapter(*row)
+        for row in db.session.execute(
+            select(Chapter.id, Chapter.subject_id, Chapter.name, Chapter.description).order_by(Chapter.id)
+        )
+    }
+    chapters_by_subject = {}
+    for chapter in chapters.values():
+        chapters_by_subject.setdefault(chapter.subject_id, []).append(chapter)
+
+    # Question counts come from the QuizStat rollup, one primary-key lookup
+    # per quiz; quizzes outside a chapter never show up on the dashboard.
+    names = {subject.id: subject.name for subject in subjects}
+    quizzes = []
+    for row in db.session.execute(
+        select(Quiz.id, Quiz.chapter_id, Quiz.date_of_quiz, Quiz.time_duration, Quiz.remarks,
+               func.coalesce(QuizStat.question_count, 0))
+        .outerjoin(QuizStat, QuizStat.quiz_id == Quiz.id)
+        .order_by(Quiz.id)
+    ):
+        quiz_id, chapter_id, date_of_quiz, time_duration, remarks, num_questions = row
+        chapter = chapters.get(chapter_id)
+        if chapter is None or chapter.subject_id not in names:
+            continue
+        quizzes.append(CatalogQuiz(
+            quiz_id, chapter_id, chapter.name, chapter.subject_id, names[chapter.subject_id],
+            date_of_quiz, time_duration, remarks, num_questions
+        ))
+
+    return Catalog(
+        generation, scores_generation, subjects, chapters,
+        {subject_id: tuple(rows) for subject_id, rows in chapters_by_subject.items()},
+        tuple(quizzes), {quiz.id: quiz for quiz in quizzes}, time.monotonic()
+    )
+
+
+class CatalogCache:
+    """One catalog per worker, reloaded when the shared generation moves on.
+
+    Admin writes call bump() inside their transaction, so the new generation
+    commits with the rows it describes. Readers compare generations at most once
+    every check_interval seconds; the worker that committed a bump rechecks on
+    its next read.
+    """
+
+    def __init__(self, check_interval=1.0, loader=load_catalog):
+        self.check_interval = check_interval
+        self.loader = loader
+        self.hits = 0
+        self.checks = 0
+        self.loads = 0
+        self._catalog = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def get(self):
+        catalog = self._catalog
+        if catalog is not None and time.monotonic() - self._checked_at < self.check_interval:
+            self.hits += 1
+            return catalog
+
+        # Only one thread per worker checks and reloads; the rest wait and reuse it.
+        with self._lock:
+            catalog = self._catalog
+            if catalog is not None and time.monotonic() - self._checked_at < self.check_interval:
+                self.hits += 1
+                return catalog
+            self.checks += 1
+            generation, scores_generation = current_version()
+            if catalog is None or catalog.generation != generation:
+                catalog = self.loader(generation, scores_generation)
+                self._catalog = catalog
+                self.loads += 1
+            self._checked_at = time.monotonic()
+            return catalog
+
+    def bump(self, scores=False):
+        """Start a new generation; scores=True when attempts were removed or regraded too."""
+        stats.upsert_increments(
+            CatalogVersion, [{'id': 1, 'generation': 1, 'scores_generation': int(scores)}],
+            ['id'], ['generation', 'scores_generation']
+        )
+        db.session.info['catalog_bumped'] = True
+
+    def _after_commit(self, session):
+        if session.info.pop('catalog_bumped', False):
+            self._checked_at = float('-inf')
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('catalog_bumped', None)
+
+    def clear(self):
+        with self._lock:
+            self._catalog = None
+            self._checked_at = float('-inf')
+
+    def stats(self):
+        catalog = self._catalog
+        return {
+            'generation': catalog.generation if catalog is not None else -1,
+            'subjects': len(catalog.subjects) if catalog is not None else 0,
+            'quizzes': len(catalog.quizzes) if catalog is not None else 0,
+            'check_interval': self.check_interval,
+            'hits': self.hits,
+            'checks': self.checks,
+            'loads': self.loads,
+        }
+
+
+catalog = CatalogCache()
+event.listen(db.session, 'after_commit', catalog._after_commit)
+event.listen(db.session, 'after_soft_rollback', catalog._after_rollback)
+
+
+def init_app(app):
+    catalog.check_interval = app.config.get('CATALOG_CHECK_INTERVAL', catalog.check_interval)
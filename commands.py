@@ -0,0 +1,208 @@
+import click
+from datetime import datetime
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import inspect
+
+from model import db, User, UserSubjectMonthStat, QuizStat, ChapterScoreHistogram, SubjectDayStat
+import querycheck
+import rescore
+import stats
+import analytics
+import bulk_io
+import search as search_index
+import assets
+from score_archive import score_archive, month_bounds, ArchiveError
+from quiz_cache import quiz_cache
+from catalog import catalog
+from credentials import credentials
+from sessions import revoke_user_sessions
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db():
+    """Create the schema on a fresh database, or migrate an existing one to head.
+
+    Run once per deploy before the workers start, so they never race each
+    other to create tables.
+    """
+    from flask_migrate import stamp, upgrade
+
+    if inspect(db.engine).get_table_names():
+        upgrade()
+        click.echo('Database migrated to the latest revision.')
+        return
+    db.create_all()
+    if db.engine.dialect.name == 'sqlite':
+        search_index.install()
+    stamp()
+    click.echo('Database created at the latest revision.')
+
+
+@click.command('seed')
+@click.option('--email', default='admin@example.com', show_default=True, envvar='ADMIN_EMAIL')
+@click.option('--password', default='admin123', envvar='ADMIN_PASSWORD', help='Read from ADMIN_PASSWORD if set.')
+@with_appcontext
+def seed(email, password):
+    """Create the admin account if it does not exist yet."""
+    if User.query.filter_by(email=email).first():
+        click.echo(f'Admin user {email} already exists.')
+        return
+    db.session.add(User(
+        email=email,
+        password=credentials.hash(password),
+        is_admin=True,
+        fullname="Admin User",
+        dob=datetime.strptime("1990-01-01", "%Y-%m-%d").date(),
+        qualification="Master's Degree"
+    ))
+    db.session.commit()
+    click.echo(f'Admin user {email} created.')
+
+
+@click.command('check-indexes')
+@with_appcontext
+def check_indexes():
+    """EXPLAIN every read route's queries and fail on unindexed table scans."""
+    failed = False
+    for result in querycheck.check_routes(current_app._get_current_object()):
+        status = 'FAIL' if result['unindexed'] else 'ok'
+        click.echo(f"[{status}] {result['endpoint']}: {result['statement'][:100]}")
+        for line in result['plan']:
+            click.echo(f'        {line}')
+        failed = failed or bool(result['unindexed'])
+    if failed:
+        raise SystemExit(1)
+
+
+@click.command('rescore')
+@click.option('--quiz-id', 'quiz_ids', type=int, multiple=True, help='Only regrade these quizzes (repeatable).')
+@click.option('--chunk-size', default=5000, show_default=True, help='Attempts read and updated per transaction.')
+@click.option('--workers', default=1, show_default=True, help='Regrade quizzes in parallel worker processes.')
+@with_appcontext
+def rescore_command(quiz_ids, chunk_size, workers):
+    """Recompute Score.total_scored from stored answers and the current answer keys.
+
+    Archived months keep the totals they were archived with.
+    """
+    rescore.run(current_app._get_current_object(), quiz_ids, chunk_size=chunk_size, workers=workers, report=click.echo)
+    quiz_cache.clear()
+    # Workers rebuild their leaderboards when the scores generation moves.
+    catalog.bump(scores=True)
+    db.session.commit()
+
+
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats():
+    """Recompute the rollup and admin analytics tables from the base tables."""
+    stats.rebuild()
+    analytics.rebuild()
+    archived = score_archive.add_to_rollups()
+    if archived:
+        click.echo(f'Added {archived} archived attempts.')
+    # Question counts on the dashboard come from QuizStat.
+    catalog.bump()
+    db.session.commit()
+    click.echo(f'Rebuilt {UserSubjectMonthStat.query.count()} user/subject/month rows, '
+               f'{QuizStat.query.count()} quiz rows, {ChapterScoreHistogram.query.count()} '
+               f'chapter score buckets and {SubjectDayStat.query.count()} subject/day rows.')
+
+
+@click.command('rebuild-search')
+@with_appcontext
+def rebuild_search():
+    """Re-index every subject, chapter and question for /search."""
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('The search index needs SQLite with FTS5; other databases use LIKE matching.')
+    click.echo(f'Indexed {search_index.rebuild()} subjects, chapters and questions.')
+
+
+@click.command('revoke-sessions')
+@click.argument('email')
+@with_appcontext
+def revoke_sessions(email):
+    """Sign a user out everywhere by deleting all of their sessions."""
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        raise click.ClickException(f'No user with email {email}')
+    click.echo(f'Revoked {revoke_user_sessions(user.id)} sessions for {email}.')
+
+
+@click.command('purge-sessions')
+@with_appcontext
+def purge_sessions():
+    """Delete expired server-side sessions."""
+    click.echo(f'Purged {current_app.session_interface.backend.purge_expired()} expired sessions.')
+
+
+@click.command('import-questions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(bulk_io.FORMATS), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Questions inserted per transaction.')
+@with_appcontext
+def import_questions_command(path, fmt, chunk_size):
+    """Bulk-load questions from a CSV or JSONL file with Question's columns."""
+    with open(path, encoding='utf-8-sig', newline='') as lines:
+        try:
+            result = bulk_io.import_questions(lines, fmt or bulk_io.format_for(path), chunk_size, report=click.echo)
+        except bulk_io.BulkIOError as e:
+            raise click.ClickException(str(e))
+    for line, error in result.errors:
+        click.echo(f'line {line}: {error}', err=True)
+    click.echo(f'Imported {result.imported} questions into {len(result.quiz_ids)} quizzes in '
+               f'{result.seconds:.2f}s, rejected {result.rejected} rows.')
+
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(list(bulk_io.EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(bulk_io.FORMATS), default='csv', show_default=True)
+@click.option('--quiz-id', type=int, help='Only rows belonging to this quiz.')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Defaults to stdout.')
+@with_appcontext
+def export_command(kind, fmt, quiz_id, output):
+    """Stream quizzes, questions or scores out as CSV or JSONL."""
+    for chunk in bulk_io.export_lines(kind, fmt, quiz_id):
+        output.write(chunk)
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets():
+    """Minify the stylesheets into static/dist with content-hash names and precompressed copies."""
+    manifest = assets.build(current_app.static_folder, report=click.echo)
+    if assets.brotli is None:
+        click.echo('brotli is not installed; wrote gzip copies only.')
+    click.echo(f'Built {len(manifest)} bundles.')
+
+
+@click.command('archive-scores')
+@click.option('--before', metavar='YYYY-MM', help='First month to keep in Score. Defaults to the current month.')
+@click.option('--verify', is_flag=True,
+              help='Check each month reads back the same from the archive before committing it.')
+@with_appcontext
+def archive_scores_command(before, verify):
+    """Move closed months of Score into the score archive."""
+    try:
+        keep_from = month_bounds(before)[0] if before else datetime.utcnow().replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0)
+    except ValueError:
+        raise click.BadParameter('use YYYY-MM', param_hint='--before')
+    try:
+        results = score_archive.archive(keep_from, verify=verify, report=click.echo)
+    except ArchiveError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Archived {sum(result.rows for result in results)} attempts from {len(results)} months'
+               f'{" (verified)" if verify else ""}.')
+
+
+COMMANDS = [
+    init_db, seed, check_indexes, rescore_command, rebuild_stats, rebuild_search, revoke_sessions,
+    purge_sessions, import_questions_command, export_command, build_assets, archive_scores_command,
+]
+
+
+def init_app(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from model import db
+
+
+class Credentials:
+    def __init__(self, method='pbkdf2:sha256:600000', workers=None, max_attempts=10, window=60, max_tracked=10000):
+        self.method = method
+        self.workers = workers or os.cpu_count() or 1
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_tracked = max_tracked
+        self._prefix = None
+        self._dummy_hash = None
+        self._pool = None
+        self._pid = None
+        self._pool_lock = threading.Lock()
+        self._attempts_lock = threading.Lock()
+        self._attempts = OrderedDict()
+        self._metrics_lock = threading.Lock()
+        self.verified = 0
+        self.failed = 0
+        self.rehashed = 0
+        self.limited = 0
+        self.verify_ms_total = 0.0
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS') or self.workers
+        self.max_attempts = app.config.get('LOGIN_MAX_ATTEMPTS', self.max_attempts)
+        self.window = app.config.get('LOGIN_ATTEMPT_WINDOW', self.window)
+        self._prefix = None
+        self._dummy_hash = None
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def needs_rehash(self, password_hash):
+        # Werkzeug spells out the full parameters (e.g. pbkdf2:sha256:600000) in
+        # the stored hash, so anything hashed under another policy differs here.
+        if self._prefix is None:
+            self._dummy_hash = self.hash(os.urandom(16).hex())
+            self._prefix = self._dummy_hash.split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+    def verify(self, password_hash, password):
+        started = time.perf_counter()
+        ok = self._executor().submit(check_password_hash, password_hash, password).result()
+        with self._metrics_lock:
+            self.verify_ms_total += (time.perf_counter() - started) * 1000
+        return ok
+
+    def _executor(self):
+        # hashlib's pbkdf2 and scrypt release the GIL, so a small thread pool
+        # spreads verification over the cores while capping how many run at once.
+        # Like the score writer, each forked worker gets its own pool.
+        if self._pool is not None and self._pid == os.getpid():
+            return self._pool
+        with self._pool_lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='credentials')
+                self._pid = os.getpid()
+        return self._pool
+
+    def rate_limited(self, email):
+        key = email.strip().lower()
+        cutoff = time.monotonic() - self.window
+        with self._attempts_lock:
+            attempts = self._attempts.get(key)
+            if attempts is None:
+                return False
+            while attempts and attempts[0] < cutoff:
+                attempts.popleft()
+            if not attempts:
+                del self._attempts[key]
+                return False
+            limited = len(attempts) >= self.max_attempts
+        if limited:
+            with self._metrics_lock:
+                self.limited += 1
+        return limited
+
+    def _record_failure(self, email):
+        key = email.strip().lower()
+        with self._attempts_lock:
+            attempts = self._attempts.pop(key, None) or deque(maxlen=self.max_attempts)
+            attempts.append(time.monotonic())
+            self._attempts[key] = attempts
+            while len(self._attempts) > self.max_tracked:
+                self._attempts.popitem(last=False)
+
+    def _reset(self, email):
+        with self._attempts_lock:
+            self._attempts.pop(email.strip().lower(), None)
+
+    def authenticate(self, user, email, password):
+        if user is None:
+            # Burn the same work as a real check so response times don't reveal
+            # which emails are registered.
+            self.needs_rehash('')
+            self.verify(self._dummy_hash, password)
+            ok = False
+        else:
+            ok = self.verify(user.password, password)
+
+        with self._metrics_lock:
+            if ok:
+                self.verified += 1
+            else:
+                self.failed += 1
+        if not ok:
+            self._record_failure(email)
+            return False
+
+        self._reset(email)
+        if self.needs_rehash(user.password):
+            user.password = self.hash(password)
+            db.session.commit()
+            with self._metrics_lock:
+                self.rehashed += 1
+        return True
+
+    def metrics(self):
+        with self._metrics_lock:
+            checks = self.verified + self.failed
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'verified': self.verified,
+                'failed': self.failed,
+                'rehashed': self.rehashed,
+                'rate_limited': self.limited,
+                'verify_ms_avg': round(self.verify_ms_total / checks, 3) if checks else 0.0,
+            }
+
+
+credentials = Credentials()
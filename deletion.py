@@ -0,0 +1,107 @@
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, literal, select
+
+import analytics
+import stats
+from model import (
+    db, Subject, Chapter, Quiz, Question, QuestionOption, Score, DeletedScore,
+    UserSubjectMonthStat, QuizStat, ChapterScoreHistogram, SubjectDayStat
+)
+from quiz_cache import quiz_cache
+from catalog import catalog
+from score_archive import score_archive
+
+
+DeletionResult = namedtuple('DeletionResult', 'subjects chapters quizzes questions scores seconds')
+
+
+def delete_subjects(subject_ids, batch_size=5000):
+    subject_ids = list(subject_ids)
+    chapters = select(Chapter.id).where(Chapter.subject_id.in_(subject_ids))
+    return _delete(subject_ids, chapters, select(Quiz.id).where(Quiz.chapter_id.in_(chapters)), batch_size)
+
+
+def delete_chapters(chapter_ids, batch_size=5000):
+    chapter_ids = list(chapter_ids)
+    return _delete(None, chapter_ids, select(Quiz.id).where(Quiz.chapter_id.in_(chapter_ids)), batch_size)
+
+
+def delete_quizzes(quiz_ids, batch_size=5000):
+    return _delete(None, None, list(quiz_ids), batch_size)
+
+
+def archive_scores(quizzes, limit=None):
+    """Move up to limit attempts at the given quizzes into DeletedScore.
+
+    The rollups are decremented for exactly the rows moved, so stopping
+    between batches leaves the counters matching what is still in Score.
+    """
+    batch = select(Score.id).where(Score.quiz_id.in_(quizzes)).order_by(Score.id)
+    score_ids = db.session.execute(batch.limit(limit) if limit else batch).scalars().all()
+    if not score_ids:
+        return 0
+    stats.forget_scores(Score.id.in_(score_ids))
+    analytics.forget_scores(Score.id.in_(score_ids))
+    db.session.execute(insert(DeletedScore).from_select(
+        ['original_score_id', 'quiz_id', 'chapter_id', 'subject_id', 'user_id', 'time_stamp_of_attempt', 'total_scored',
+         'answers', 'deleted_at'],
+        select(
+            Score.id, Score.quiz_id, Quiz.chapter_id, Chapter.subject_id, Score.user_id,
+            Score.time_stamp_of_attempt, Score.total_scored, Score.answers, literal(datetime.utcnow())
+        )
+        .join(Quiz, Score.quiz_id == Quiz.id)
+        .outerjoin(Chapter, Quiz.chapter_id == Chapter.id)
+        .where(Score.id.in_(score_ids))
+    ))
+    db.session.execute(delete(Score).where(Score.id.in_(score_ids)))
+    return len(score_ids)
+
+
+def _delete(subject_ids, chapters, quizzes, batch_size):
+    """Delete quizzes and everything under them with set-based statements.
+
+    chapters and quizzes are id lists or SELECTs of ids; subject_ids and
+    chapters are None when only the levels below them go. Attempts are archived
+    first, one committed batch at a time, so a large deletion never holds the
+    write lock for long; the structure itself goes in one final transaction.
+    The foreign keys cascade too, but nothing here relies on the pragma being on.
+    """
+    started = time.perf_counter()
+    quiz_ids = db.session.execute(select(Quiz.id).where(Quiz.id.in_(quizzes))).scalars().all()
+
+    archived = 0
+    while True:
+        moved = archive_scores(quiz_ids, batch_size)
+        db.session.commit()
+        archived += moved
+        if moved < batch_size:
+            break
+
+    # Attempts submitted while the batches ran go with the final transaction.
+    archived += archive_scores(quiz_ids)
+    # Attempts in the score archive stay in their segments, skipped from now on.
+    score_archive.forget_quizzes(quiz_ids)
+    questions = select(Question.id).where(Question.quiz_id.in_(quiz_ids))
+    question_count = db.session.execute(select(func.count()).select_from(questions.subquery())).scalar()
+    db.session.execute(delete(QuestionOption).where(QuestionOption.question_id.in_(questions)))
+    db.session.execute(delete(Question).where(Question.quiz_id.in_(quiz_ids)))
+    db.session.execute(delete(QuizStat).where(QuizStat.quiz_id.in_(quiz_ids)))
+    db.session.execute(delete(Quiz).where(Quiz.id.in_(quiz_ids)))
+    chapter_count = 0
+    if chapters is not None:
+        db.session.execute(delete(ChapterScoreHistogram).where(ChapterScoreHistogram.chapter_id.in_(chapters)))
+        chapter_count = db.session.execute(delete(Chapter).where(Chapter.id.in_(chapters))).rowcount
+    subject_count = 0
+    if subject_ids is not None:
+        db.session.execute(delete(UserSubjectMonthStat).where(UserSubjectMonthStat.subject_id.in_(subject_ids)))
+        db.session.execute(delete(SubjectDayStat).where(SubjectDayStat.subject_id.in_(subject_ids)))
+        subject_count = db.session.execute(delete(Subject).where(Subject.id.in_(subject_ids))).rowcount
+    catalog.bump(scores=True)
+    db.session.commit()
+    quiz_cache.invalidate(*quiz_ids)
+    return DeletionResult(
+        subject_count, chapter_count, len(quiz_ids), question_count, archived, time.perf_counter() - started
+    )
@@ -0,0 +1,130 @@
+from collections import namedtuple
+
+import numpy as np
+
+
+MAX_OPTIONS = 16
+UNANSWERED = 0
+
+
+GradeResult = namedtuple('GradeResult', 'total earned correct bitmap')
+BatchGradeResult = namedtuple('BatchGradeResult', 'totals earned correct')
+
+# Answers and keys are choice masks: bit p - 1 set means option p (1-based) was
+# chosen, or is correct. Stored attempts are (question_id, mask) pairs, 6 bytes
+# per answered question. Keying by question id rather than position keeps them
+# valid when questions are added or removed after the attempt.
+PACKED_ANSWER = np.dtype([('question_id', '<u4'), ('mask', '<u2')])
+
+
+def option_bit(position):
+    return 1 << (position - 1)
+
+
+def positions_of(mask):
+    return [position for position in range(1, MAX_OPTIONS + 1) if mask & option_bit(position)]
+
+
+def parse_answer(value):
+    """A submitted answer (a position, or a list of them for multi-select) as a mask."""
+    mask = UNANSWERED
+    for item in value if isinstance(value, (list, tuple)) else [value]:
+        try:
+            position = int(item)
+        except (TypeError, ValueError):
+            continue
+        if 1 <= position <= MAX_OPTIONS:
+            mask |= option_bit(position)
+    return mask
+
+
+def compact_options(texts, correct_positions):
+    """Drop blank options and renumber the correct positions to match.
+
+    Returns the remaining option texts and the correct mask over them.
+    """
+    correct_positions = set(correct_positions)
+    options = []
+    mask = 0
+    for position, text in enumerate(texts, 1):
+        text = (text or '').strip()
+        if not text:
+            continue
+        options.append(text)
+        if position in correct_positions:
+            mask |= option_bit(len(options))
+    return options, mask
+
+
+class AnswerKey:
+    """A quiz's answer key compiled to arrays indexed by question position.
+
+    A question earns its weight (1 unless given; fractions give partial
+    credit) only when the chosen mask equals the correct mask, so a
+    multi-select question needs every correct option and nothing else.
+    Questions without a correct option earn nothing.
+    """
+
+    def __init__(self, question_ids, correct, weights=None):
+        question_ids = np.asarray(question_ids, dtype=np.int64)
+        order = np.argsort(question_ids, kind='stable')
+        self.question_ids = question_ids[order]
+        self.correct = np.asarray(correct, dtype=np.uint16)[order]
+        size = len(self.question_ids)
+        weights = np.ones(size, dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)[order]
+        self.weights = np.where(self.correct != UNANSWERED, weights, 0.0).astype(np.float32)
+        self.max_score = float(self.weights.sum())
+        self._position = {int(question_id): i for i, question_id in enumerate(self.question_ids)}
+
+    @classmethod
+    def from_questions(cls, questions, weights=None):
+        """weights, when given, is one credit per question in the same order."""
+        return cls([q.id for q in questions], [q.correct_mask for q in questions], weights)
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def encode(self, answers):
+        vector = np.zeros(len(self), dtype=np.uint16)
+        for question_id, option in answers.items():
+            try:
+                position = self._position.get(int(question_id))
+            except (TypeError, ValueError):
+                continue
+            if position is not None:
+                vector[position] = parse_answer(option)
+        return vector
+
+    def pack(self, vector):
+        answered = np.flatnonzero(vector)
+        packed = np.empty(len(answered), dtype=PACKED_ANSWER)
+        packed['question_id'] = self.question_ids[answered]
+        packed['mask'] = vector[answered]
+        return packed.tobytes()
+
+    def decode_packed(self, blobs):
+        matrix = np.zeros((len(blobs), len(self)), dtype=np.uint16)
+        if not len(self) or not len(blobs):
+            return matrix
+        blobs = [blob or b'' for blob in blobs]
+        packed = np.frombuffer(b''.join(blobs), dtype=PACKED_ANSWER)
+        rows = np.repeat(np.arange(len(blobs)), [len(blob) // PACKED_ANSWER.itemsize for blob in blobs])
+        positions = np.minimum(np.searchsorted(self.question_ids, packed['question_id']), len(self) - 1)
+        known = self.question_ids[positions] == packed['question_id']
+        matrix[rows[known], positions[known]] = packed['mask'][known]
+        return matrix
+
+    def grade(self, answers):
+        vector = answers if isinstance(answers, np.ndarray) else self.encode(answers)
+        correct = (vector == self.correct) & (vector != UNANSWERED)
+        earned = np.where(correct, self.weights, 0.0)
+        return GradeResult(float(earned.sum()), earned, correct, np.packbits(correct).tobytes())
+
+    def grade_packed(self, blobs):
+        return self.grade_batch(self.decode_packed(blobs))
+
+    def grade_batch(self, matrix):
+        matrix = np.asarray(matrix, dtype=np.uint16)
+        correct = (matrix == self.correct[np.newaxis, :]) & (matrix != UNANSWERED)
+        earned = np.where(correct, self.weights[np.newaxis, :], 0.0)
+        return BatchGradeResult(earned.sum(axis=1), earned, correct)
@@ -0,0 +1,175 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict, deque
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger('quiz_master.slow_queries')
+
+_literal = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_in_list = re.compile(r'\bIN \((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_space = re.compile(r'\s+')
+
+
+def normalize(statement):
+    statement = _space.sub(' ', statement).strip()
+    statement = _literal.sub('?', statement)
+    return _in_list.sub('IN (...)', statement)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self, slow_query_ms=100, slow_log_size=100, max_statements=500):
+        self.slow_query_ms = slow_query_ms
+        self.max_statements = max_statements
+        self.lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries_per_request = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+        self.db_queries = defaultdict(int)
+        self.db_seconds = defaultdict(float)
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.statements = OrderedDict()
+
+    def record_request(self, endpoint, method, status, seconds, queries):
+        with self.lock:
+            self.requests[(endpoint, method, status)] += 1
+            self.latency[endpoint].observe(seconds)
+            self.queries_per_request[endpoint].observe(queries)
+
+    def record_query(self, endpoint, statement, seconds):
+        with self.lock:
+            self.db_queries[endpoint] += 1
+            self.db_seconds[endpoint] += seconds
+        if seconds * 1000 < self.slow_query_ms:
+            return
+        normalized = normalize(statement)
+        with self.lock:
+            self.slow_queries.append({
+                'endpoint': endpoint,
+                'statement': normalized,
+                'ms': round(seconds * 1000, 3),
+                'at': time.time(),
+            })
+            entry = self.statements.pop(normalized, None) or {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            entry['count'] += 1
+            entry['total_ms'] += seconds * 1000
+            entry['max_ms'] = max(entry['max_ms'], seconds * 1000)
+            self.statements[normalized] = entry
+            if len(self.statements) > self.max_statements:
+                self.statements.popitem(last=False)
+        logger.warning('slow query (%.1f ms) in %s: %s', seconds * 1000, endpoint, normalized)
+
+    def slow_log(self):
+        with self.lock:
+            return {
+                'threshold_ms': self.slow_query_ms,
+                'recent': list(self.slow_queries),
+                'by_statement': [dict(entry, statement=statement) for statement, entry in self.statements.items()],
+            }
+
+    def render(self, gauges=None):
+        lines = []
+        with self.lock:
+            lines.append('# TYPE quiz_http_requests_total counter')
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'quiz_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+            _render_histograms(lines, 'quiz_http_request_duration_seconds', self.latency)
+            _render_histograms(lines, 'quiz_db_queries_per_request', self.queries_per_request)
+            lines.append('# TYPE quiz_db_queries_total counter')
+            for endpoint, count in sorted(self.db_queries.items()):
+                lines.append(f'quiz_db_queries_total{{endpoint="{endpoint}"}} {count}')
+            lines.append('# TYPE quiz_db_seconds_total counter')
+            for endpoint, seconds in sorted(self.db_seconds.items()):
+                lines.append(f'quiz_db_seconds_total{{endpoint="{endpoint}"}} {seconds:.6f}')
+            lines.append('# TYPE quiz_slow_queries_total counter')
+            lines.append(f'quiz_slow_queries_total {sum(entry["count"] for entry in self.statements.values())}')
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _render_histograms(lines, name, histograms):
+    lines.append(f'# TYPE {name} histogram')
+    for endpoint, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {histogram.total:.6f}')
+        lines.append(f'{name}_count{{endpoint="{endpoint}"}} {histogram.count}')
+
+
+metrics = Metrics()
+
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return 'background'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    seconds = time.perf_counter() - started
+    if has_request_context() and 'request_started' in g:
+        g.query_count += 1
+    metrics.record_query(_endpoint(), statement, seconds)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_started'):
+        connection.info['query_started'].pop()
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.query_count = 0
+
+
+def _after_request(response):
+    if 'request_started' in g:
+        metrics.record_request(
+            request.endpoint or 'unmatched', request.method, response.status_code,
+            time.perf_counter() - g.request_started, g.query_count,
+        )
+    return response
+
+
+def init_app(app, db):
+    metrics.slow_query_ms = app.config.get('SLOW_QUERY_MS', metrics.slow_query_ms)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(db.engine, 'handle_error', _handle_error)
@@ -0,0 +1,296 @@
+import threading
+import time
+from collections import namedtuple
+
+from sortedcontainers import SortedList
+from sqlalchemy import func, select
+
+from catalog import catalog
+from model import db, Score
+from score_archive import score_archive
+
+
+Standing = namedtuple('Standing', 'rank user_id score time_stamp_of_attempt')
+
+
+class Board:
+    """Each user's best result, kept sorted as (-score, time reached, user_id).
+
+    The higher score ranks first and, on equal scores, whoever got there
+    first; rank lookups and updates are O(log n).
+    """
+
+    def __init__(self):
+        self.entries = SortedList()
+        self.keys = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def offer(self, user_id, score, time_stamp):
+        """Keep this result if it beats the user's best; return the replaced key, or False."""
+        key = (-score, time_stamp, user_id)
+        old = self.keys.get(user_id)
+        if old is not None and old <= key:
+            return False
+        self.put(user_id, key)
+        return old
+
+    def put(self, user_id, key):
+        old = self.keys.get(user_id)
+        if old is not None:
+            self.entries.remove(old)
+        self.entries.add(key)
+        self.keys[user_id] = key
+
+    def rank(self, user_id):
+        key = self.keys.get(user_id)
+        return None if key is None else self.entries.index(key) + 1
+
+    def top(self, k):
+        return [
+            Standing(rank, user_id, -score, time_stamp)
+            for rank, (score, time_stamp, user_id) in enumerate(self.entries[:k], 1)
+        ]
+
+
+class Leaderboard:
+    """Per-quiz and per-subject boards for this worker, loaded on first use.
+
+    Boards load from Score and the archived months, then follow Score through
+    the id watermark: every sync_interval seconds the attempts committed since
+    the last sync, by any worker, are applied to the boards already loaded.
+    Deleting quizzes or rescoring moves the scores generation and drops them
+    all, to be rebuilt when next read; other catalog edits only drop the boards
+    of quizzes that appeared, went away or moved to another subject.
+
+    Loads and syncs read the database without holding the lock and take it
+    only to apply what they read, so a cold board never holds up submissions
+    to the boards already loaded.
+    """
+
+    def __init__(self, sync_interval=1.0, sync_lookback=1000):
+        self.sync_interval = sync_interval
+        self.sync_lookback = sync_lookback
+        self.loads = 0
+        self.syncs = 0
+        self.synced_rows = 0
+        self._quizzes = {}
+        self._subjects = {}
+        self._quiz_subject = {}
+        self._loading = {}
+        self._generation = None
+        self._scores_generation = None
+        self._epoch = 0
+        self._watermark = None
+        self._synced_at = float('-inf')
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def record(self, quiz_id, user_id, score, time_stamp):
+        """Put a just-graded attempt on the boards and say where it stands.
+
+        The percentile is the share of the other students on this quiz whose
+        best this attempt beats.
+        """
+        self._refresh()
+        loaded = self._quiz_board(quiz_id)
+        with self._lock:
+            board = self._quizzes.get(quiz_id, loaded)
+            key = (-score, time_stamp, user_id)
+            ahead = board.entries.bisect_left(key)
+            own = board.keys.get(user_id)
+            others = len(board) - (own is not None)
+            if own is not None and own < key:
+                ahead -= 1
+            self._offer(board, quiz_id, user_id, score, time_stamp)
+            return {
+                'rank': ahead + 1,
+                'participants': others + 1,
+                'percentile': round(100.0 * (others - ahead) / others, 1) if others else 100.0,
+            }
+
+    def top(self, kind, ref_id, k=10):
+        self._refresh()
+        board = self._board(kind, ref_id)
+        with self._lock:
+            return board.top(k)
+
+    def standing(self, kind, ref_id, user_id):
+        """The user's (rank, best) on a board and how many are on it; rank is None without an attempt."""
+        self._refresh()
+        board = self._board(kind, ref_id)
+        with self._lock:
+            key = board.keys.get(user_id)
+            return board.rank(user_id), (-key[0] if key else None), len(board)
+
+    def clear(self):
+        with self._lock:
+            self._reset(None)
+            self._generation = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'quizzes': len(self._quizzes),
+                'subjects': len(self._subjects),
+                'entries': sum(len(board) for board in self._quizzes.values()),
+                'watermark': self._watermark or 0,
+                'sync_interval': self.sync_interval,
+                'loads': self.loads,
+                'syncs': self.syncs,
+                'synced_rows': self.synced_rows,
+            }
+
+    def _board(self, kind, ref_id):
+        return self._quiz_board(ref_id) if kind == 'quiz' else self._subject_board(ref_id)
+
+    def _reset(self, scores_generation):
+        # Loads and syncs that started before this see the epoch move and drop their rows.
+        self._quizzes.clear()
+        self._subjects.clear()
+        self._loading.clear()
+        self._scores_generation = scores_generation
+        self._watermark = None
+        self._epoch += 1
+
+    def _restructure(self, quiz_subject):
+        for quiz_id in self._quiz_subject.keys() | quiz_subject.keys():
+            old, new = self._quiz_subject.get(quiz_id), quiz_subject.get(quiz_id)
+            if old != new:
+                self._quizzes.pop(quiz_id, None)
+                self._loading.pop(quiz_id, None)
+                self._subjects.pop(old, None)
+                self._subjects.pop(new, None)
+
+    def _refresh(self):
+        current = catalog.get()
+        with self._lock:
+            if current.generation != self._generation:
+                quiz_subject = {quiz.id: quiz.subject_id for quiz in current.quizzes}
+                if current.scores_generation != self._scores_generation:
+                    self._reset(current.scores_generation)
+                else:
+                    self._restructure(quiz_subject)
+                self._generation = current.generation
+                self._quiz_subject = quiz_subject
+            epoch, watermark = self._epoch, self._watermark
+            if watermark is not None and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+        if watermark is None:
+            latest = db.session.execute(select(func.max(Score.id))).scalar() or 0
+            with self._lock:
+                if self._epoch == epoch and self._watermark is None:
+                    self._watermark = latest
+                    self._synced_at = time.monotonic()
+        else:
+            self._sync(epoch, watermark)
+
+    def _sync(self, epoch, watermark):
+        # One thread per worker syncs; the others go on with the boards as they are.
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            # Ids are handed out before commit, so with concurrent writers a lower
+            # id can become visible after a higher one was synced. Re-reading the
+            # last sync_lookback ids picks those up; offering a result twice is a no-op.
+            rows = db.session.execute(
+                select(Score.id, Score.quiz_id, Score.user_id, Score.total_scored, Score.time_stamp_of_attempt)
+                .where(Score.id > watermark - self.sync_lookback)
+                .order_by(Score.id)
+            ).all()
+            with self._lock:
+                if self._epoch != epoch:
+                    return
+                for score_id, quiz_id, user_id, total_scored, time_stamp in rows:
+                    # Attempts this worker recorded at submit time come back here as no-ops.
+                    board = self._quizzes.get(quiz_id)
+                    if board is not None:
+                        self._offer(board, quiz_id, user_id, total_scored, time_stamp)
+                    elif quiz_id in self._loading:
+                        self._loading[quiz_id].append((user_id, total_scored, time_stamp))
+                if rows:
+                    self._watermark = max(self._watermark, rows[-1].id)
+                self._synced_at = time.monotonic()
+                self.syncs += 1
+                self.synced_rows += sum(1 for row in rows if row.id > watermark)
+        finally:
+            self._sync_lock.release()
+
+    def _offer(self, board, quiz_id, user_id, score, time_stamp):
+        old = board.offer(user_id, score, time_stamp)
+        subject = self._subjects.get(self._quiz_subject.get(quiz_id))
+        if old is False or subject is None:
+            return
+        # A subject ranks users by the sum of their best scores on its quizzes.
+        gained = score + (old[0] if old is not None else 0)
+        current = subject.keys.get(user_id, (0, time_stamp, user_id))
+        subject.put(user_id, (current[0] - gained, max(current[1], time_stamp), user_id))
+
+    def _quiz_board(self, quiz_id):
+        board = self._quizzes.get(quiz_id)
+        if board is not None:
+            return board
+        # Cold loads queue behind each other, not behind the boards already loaded.
+        with self._load_lock:
+            with self._lock:
+                board = self._quizzes.get(quiz_id)
+                if board is not None:
+                    return board
+                self._loading[quiz_id] = []
+                listed = quiz_id in self._quiz_subject
+            board = Board()
+            rows = db.session.execute(
+                select(Score.user_id, Score.total_scored, Score.time_stamp_of_attempt).where(Score.quiz_id == quiz_id)
+            )
+            for user_id, total_scored, time_stamp in rows:
+                board.offer(user_id, total_scored, time_stamp)
+            # Archived attempts outlive their quiz; only listed quizzes take them.
+            if listed:
+                for user_id, total_scored, time_stamp in score_archive.quiz_results(quiz_id):
+                    board.offer(user_id, total_scored, time_stamp)
+            with self._lock:
+                # Whatever the syncs saw while the board loaded; None if it was dropped meanwhile.
+                pending = self._loading.pop(quiz_id, None)
+                if pending is not None:
+                    for user_id, total_scored, time_stamp in pending:
+                        board.offer(user_id, total_scored, time_stamp)
+                    self._quizzes[quiz_id] = board
+                    self.loads += 1
+            return board
+
+    def _subject_board(self, subject_id):
+        board = self._subjects.get(subject_id)
+        if board is not None:
+            return board
+        with self._lock:
+            quiz_ids = [quiz_id for quiz_id, quiz_subject in self._quiz_subject.items() if quiz_subject == subject_id]
+        boards = [self._quiz_board(quiz_id) for quiz_id in quiz_ids]
+        with self._lock:
+            board = self._subjects.get(subject_id)
+            if board is not None:
+                return board
+            totals = {}
+            for quiz_board in boards:
+                for user_id, (score, time_stamp, _) in quiz_board.keys.items():
+                    total, reached = totals.get(user_id, (0, time_stamp))
+                    totals[user_id] = (total + score, max(reached, time_stamp))
+            board = Board()
+            for user_id, (total, reached) in totals.items():
+                board.put(user_id, (total, reached, user_id))
+            # Syncs only keep it current if every quiz board it was summed from still is.
+            current = [quiz_id for quiz_id, quiz_subject in self._quiz_subject.items() if quiz_subject == subject_id]
+            if current == quiz_ids and all(
+                self._quizzes.get(quiz_id) is quiz_board for quiz_id, quiz_board in zip(quiz_ids, boards)
+            ):
+                self._subjects[subject_id] = board
+            return board
+
+
+leaderboard = Leaderboard()
+
+
+def init_app(app):
+    leaderboard.sync_interval = app.config.get('LEADERBOARD_SYNC_INTERVAL', leaderboard.sync_interval)
+    leaderboard.sync_lookback = app.config.get('LEADERBOARD_SYNC_LOOKBACK', leaderboard.sync_lookback)
@@ -0,0 +1,32 @@
+"""give deleted_score its own key
+
+Revision ID: 0b7d4e9a2c31
+Revises: f3a8c1d5b602
+Create Date: 2026-10-19 00:21:53.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d4e9a2c31'
+down_revision = 'f3a8c1d5b602'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Score ids are reused once freed, so the archived rows keep theirs in a
+    # plain column and deleted_score numbers its own rows.
+    with op.batch_alter_table('deleted_score', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('original_score_id', sa.Integer(), nullable=True))
+    op.execute('UPDATE deleted_score SET original_score_id = id')
+    with op.batch_alter_table('deleted_score', schema=None) as batch_op:
+        batch_op.alter_column('original_score_id', existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    # The rows keep their surrogate ids; the original score ids are dropped.
+    with op.batch_alter_table('deleted_score', schema=None) as batch_op:
+        batch_op.drop_column('original_score_id')
@@ -0,0 +1,33 @@
+"""add foreign key indexes
+
+Revision ID: 3f1c2a9d7b10
+Revises:
+Create Date: 2026-10-18 09:12:41.318207
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Databases created by db.create_all() after this change already carry these
+# indexes, so every create is guarded with if_not_exists.
+def upgrade():
+    op.create_index('ix_chapter_subject_id', 'chapter', ['subject_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_quiz_chapter_id', 'quiz', ['chapter_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_question_quiz_id_id', 'question', ['quiz_id', 'id'], unique=False, if_not_exists=True)
+    op.create_index('ix_score_user_id_time_stamp', 'score', ['user_id', 'time_stamp_of_attempt'], unique=False, if_not_exists=True)
+    op.create_index('ix_score_quiz_id_total_scored', 'score', ['quiz_id', 'total_scored'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_score_quiz_id_total_scored', table_name='score')
+    op.drop_index('ix_score_user_id_time_stamp', table_name='score')
+    op.drop_index('ix_question_quiz_id_id', table_name='question')
+    op.drop_index('ix_quiz_chapter_id', table_name='quiz')
+    op.drop_index('ix_chapter_subject_id', table_name='chapter')
@@ -0,0 +1,36 @@
+"""add user session table
+
+Revision ID: 5d8e1a4c7f92
+Revises: e7b3f2a81c64
+Create Date: 2026-10-18 19:04:37.512906
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8e1a4c7f92'
+down_revision = 'e7b3f2a81c64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_session',
+    sa.Column('id', sa.String(length=64), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_user_session_user_id', 'user_session', ['user_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_user_session_expires_at', 'user_session', ['expires_at'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_user_session_expires_at', table_name='user_session')
+    op.drop_index('ix_user_session_user_id', table_name='user_session')
+    op.drop_table('user_session')
@@ -0,0 +1,26 @@
+"""add catalog scores generation
+
+Revision ID: 7c2e5f8b1a94
+Revises: 0b7d4e9a2c31
+Create Date: 2026-10-19 00:52:17.381460
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e5f8b1a94'
+down_revision = '0b7d4e9a2c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('catalog_version', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('scores_generation', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('catalog_version', schema=None) as batch_op:
+        batch_op.drop_column('scores_generation')
@@ -0,0 +1,26 @@
+"""store attempt answers
+
+Revision ID: 8a4e6c0b2d51
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-18 11:47:05.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e6c0b2d51'
+down_revision = '3f1c2a9d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('score', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('answers', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('score', schema=None) as batch_op:
+        batch_op.drop_column('answers')
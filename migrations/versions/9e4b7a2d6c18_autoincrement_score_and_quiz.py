@@ -0,0 +1,78 @@
+"""never reuse score and quiz ids
+
+Revision ID: 9e4b7a2d6c18
+Revises: 7c2e5f8b1a94
+Create Date: 2026-10-19 01:27:44.905162
+
+"""
+import glob
+import os
+
+import numpy as np
+from alembic import op
+from flask import current_app
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4b7a2d6c18'
+down_revision = '7c2e5f8b1a94'
+branch_labels = None
+depends_on = None
+
+
+# SQLite hands out max(rowid) + 1, so ids freed by archiving attempts or
+# deleting quizzes came back while segment files and deleted_score still used
+# them. Other databases use sequences, which never go backwards.
+TABLES = ('quiz', 'score')
+
+
+def _archived_max(column):
+    path = current_app.config.get('SCORE_ARCHIVE_DIR') or os.path.join(current_app.instance_path, 'score_archive')
+    highest = 0
+    for name in glob.glob(os.path.join(path, 'scores-*.npy')):
+        segment = np.load(name, mmap_mode='r')
+        if len(segment):
+            highest = max(highest, int(segment[column].max()))
+    return highest
+
+
+def _rebuild(autoincrement):
+    # Rebuilding a table drops its triggers, and renaming one fails while the
+    # search triggers on other tables still refer to it, so set them aside.
+    conn = op.get_bind()
+    triggers = conn.execute(sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")).fetchall()
+    for name, _ in triggers:
+        op.execute(f'DROP TRIGGER {name}')
+
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': autoincrement}):
+            pass
+
+    for _, sql in triggers:
+        op.execute(sql)
+
+
+def _seed(conn, table, *queries, archived=0):
+    seq = max([archived] + [conn.execute(sa.text(query)).scalar() or 0 for query in queries])
+    conn.execute(sa.text('DELETE FROM sqlite_sequence WHERE name = :name'), {'name': table})
+    conn.execute(sa.text('INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)'), {'name': table, 'seq': seq})
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'sqlite':
+        return
+    _rebuild(True)
+    # Start past every id already handed out, not just the ones still live.
+    _seed(conn, 'quiz', 'SELECT max(id) FROM quiz', 'SELECT max(quiz_id) FROM deleted_score',
+          archived=_archived_max('quiz_id'))
+    _seed(conn, 'score', 'SELECT max(id) FROM score', 'SELECT max(original_score_id) FROM deleted_score',
+          archived=_archived_max('id'))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _rebuild(False)
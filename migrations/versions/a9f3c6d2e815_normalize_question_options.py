@@ -0,0 +1,151 @@
+"""normalize question options
+
+Revision ID: a9f3c6d2e815
+Revises: 5d8e1a4c7f92
+Create Date: 2026-10-18 20:31:52.640117
+
+"""
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9f3c6d2e815'
+down_revision = '5d8e1a4c7f92'
+branch_labels = None
+depends_on = None
+
+
+# Stored attempts before and after this revision: (question_id, option 1-4)
+# and (question_id, mask of chosen 1-based positions).
+OLD_PACKED = np.dtype([('question_id', '<u4'), ('option', 'u1')])
+NEW_PACKED = np.dtype([('question_id', '<u4'), ('mask', '<u2')])
+
+CHUNK = 1000
+
+
+def _chunks(conn, statement):
+    last_id = 0
+    while True:
+        rows = conn.execute(statement, {'last_id': last_id, 'limit': CHUNK}).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows
+
+
+def _convert_answers(conn, convert):
+    statement = sa.text(
+        'SELECT id, answers FROM score WHERE answers IS NOT NULL AND id > :last_id ORDER BY id LIMIT :limit'
+    )
+    for rows in _chunks(conn, statement):
+        conn.execute(
+            sa.text('UPDATE score SET answers = :answers WHERE id = :id'),
+            [{'id': row[0], 'answers': convert(row[1])} for row in rows],
+        )
+
+
+def upgrade():
+    op.create_table('question_option',
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.SmallInteger(), nullable=False),
+    sa.Column('text', sa.String(length=255), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['question.id'], ),
+    sa.PrimaryKeyConstraint('question_id', 'position'),
+    if_not_exists=True
+    )
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('correct_mask', sa.Integer(), nullable=False, server_default='0'))
+
+    # Blank options are dropped and the ones after them move up, so positions
+    # stay contiguous; remember where each old option went for the answers.
+    conn = op.get_bind()
+    moved = {}
+    statement = sa.text(
+        'SELECT id, option1, option2, option3, option4, correct_option FROM question '
+        'WHERE id > :last_id ORDER BY id LIMIT :limit'
+    )
+    for rows in _chunks(conn, statement):
+        options = []
+        masks = []
+        for question_id, *texts, correct_option in rows:
+            mapping = {}
+            for old_position, text in enumerate(texts, 1):
+                if text and text.strip():
+                    mapping[old_position] = len(mapping) + 1
+                    options.append({'question_id': question_id, 'position': mapping[old_position], 'text': text.strip()})
+            try:
+                correct = mapping.get(int(correct_option))
+            except (TypeError, ValueError):
+                correct = None
+            masks.append({'id': question_id, 'mask': 1 << (correct - 1) if correct else 0})
+            if any(old != new for old, new in mapping.items()):
+                moved[question_id] = mapping
+        if options:
+            conn.execute(
+                sa.text('INSERT INTO question_option (question_id, position, text) VALUES (:question_id, :position, :text)'),
+                options,
+            )
+        conn.execute(sa.text('UPDATE question SET correct_mask = :mask WHERE id = :id'), masks)
+
+    def to_masks(blob):
+        old = np.frombuffer(blob, dtype=OLD_PACKED)
+        new = np.empty(len(old), dtype=NEW_PACKED)
+        new['question_id'] = old['question_id']
+        positions = [
+            moved.get(int(question_id), {}).get(int(option), int(option)) if 1 <= option <= 4 else 0
+            for question_id, option in zip(old['question_id'], old['option'])
+        ]
+        new['mask'] = [1 << (position - 1) if position else 0 for position in positions]
+        return new[new['mask'] != 0].tobytes()
+
+    _convert_answers(conn, to_masks)
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_column('correct_option')
+        batch_op.drop_column('option4')
+        batch_op.drop_column('option3')
+        batch_op.drop_column('option2')
+        batch_op.drop_column('option1')
+
+
+def downgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('option1', sa.String(length=255), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('option2', sa.String(length=255), nullable=False, server_default=''))
+        batch_op.add_column(sa.Column('option3', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('option4', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('correct_option', sa.String(length=10), nullable=False, server_default=''))
+
+    # Only the first four options and the lowest correct position survive.
+    conn = op.get_bind()
+    for position in range(1, 5):
+        conn.execute(sa.text(
+            f'UPDATE question SET option{position} = '
+            '(SELECT text FROM question_option WHERE question_id = question.id AND position = :position) '
+            'WHERE EXISTS (SELECT 1 FROM question_option WHERE question_id = question.id AND position = :position)'
+        ), {'position': position})
+    statement = sa.text(
+        'SELECT id, correct_mask FROM question WHERE id > :last_id ORDER BY id LIMIT :limit'
+    )
+    for rows in _chunks(conn, statement):
+        conn.execute(sa.text('UPDATE question SET correct_option = :correct WHERE id = :id'), [
+            {'id': question_id, 'correct': str((mask & -mask).bit_length()) if 0 < (mask & -mask) <= 8 else ''}
+            for question_id, mask in rows
+        ])
+
+    def to_options(blob):
+        new = np.frombuffer(blob, dtype=NEW_PACKED)
+        lowest = new['mask'] & -new['mask'].astype(np.int32)
+        old = np.empty(len(new), dtype=OLD_PACKED)
+        old['question_id'] = new['question_id']
+        old['option'] = [int(bit).bit_length() for bit in lowest]
+        return old[(old['option'] >= 1) & (old['option'] <= 4)].tobytes()
+
+    _convert_answers(conn, to_options)
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_column('correct_mask')
+
+    op.drop_table('question_option')
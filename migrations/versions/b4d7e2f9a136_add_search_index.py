@@ -0,0 +1,127 @@
+"""add search index
+
+Revision ID: b4d7e2f9a136
+Revises: a9f3c6d2e815
+Create Date: 2026-10-18 21:47:03.218845
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d7e2f9a136'
+down_revision = 'a9f3c6d2e815'
+branch_labels = None
+depends_on = None
+
+
+# Frozen copy of search.SCHEMA and search.SOURCES at this revision.
+SCHEMA = [
+    (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "kind UNINDEXED, ref_id UNINDEXED, title, body, tokenize = 'unicode61 remove_diacritics 2')"
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_subject_insert AFTER INSERT ON subject BEGIN '
+        "INSERT INTO search_index (rowid, kind, ref_id, title, body) SELECT id * 4 + 1, 'subject', id, name, coalesce(description, '') FROM subject WHERE id = new.id; "
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_subject_update AFTER UPDATE ON subject BEGIN '
+        'DELETE FROM search_index WHERE rowid = old.id * 4 + 1; '
+        "INSERT INTO search_index (rowid, kind, ref_id, title, body) SELECT id * 4 + 1, 'subject', id, name, coalesce(description, '') FROM subject WHERE id = new.id; "
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_subject_delete AFTER DELETE ON subject BEGIN '
+        'DELETE FROM search_index WHERE rowid = old.id * 4 + 1; '
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_chapter_insert AFTER INSERT ON chapter BEGIN '
+        "INSERT INTO search_index (rowid, kind, ref_id, title, body) SELECT id * 4 + 2, 'chapter', id, name, coalesce(description, '') FROM chapter WHERE id = new.id; "
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_chapter_update AFTER UPDATE ON chapter BEGIN '
+        'DELETE FROM search_index WHERE rowid = old.id * 4 + 2; '
+        "INSERT INTO search_index (rowid, kind, ref_id, title, body) SELECT id * 4 + 2, 'chapter', id, name, coalesce(description, '') FROM chapter WHERE id = new.id; "
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_chapter_delete AFTER DELETE ON chapter BEGIN '
+        'DELETE FROM search_index WHERE rowid = old.id * 4 + 2; '
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_question_insert AFTER INSERT ON question BEGIN '
+        'DELETE FROM search_index WHERE rowid = new.id * 4 + 3; '
+        "INSERT INTO search_index (rowid, kind, ref_id, title, body) SELECT id * 4 + 3, 'question', id, question_title, question_statement || ' ' || coalesce((SELECT group_concat(text, ' ') FROM question_option WHERE question_id = question.id), '') FROM question WHERE id = new.id; "
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_question_update AFTER UPDATE ON question BEGIN '
+        'DELETE FROM search_index WHERE rowid = old.id * 4 + 3; '
+        'DELETE FROM search_index WHERE rowid = new.id * 4 + 3; '
+        "INSERT INTO search_index (rowid, kind, ref_id, title, body) SELECT id * 4 + 3, 'question', id, question_title, question_statement || ' ' || coalesce((SELECT group_concat(text, ' ') FROM question_option WHERE question_id = question.id), '') FROM question WHERE id = new.id; "
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_question_delete AFTER DELETE ON question BEGIN '
+        'DELETE FROM search_index WHERE rowid = old.id * 4 + 3; '
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_option_insert AFTER INSERT ON question_option BEGIN '
+        'DELETE FROM search_index WHERE rowid = new.question_id * 4 + 3; '
+        "INSERT INTO search_index (rowid, kind, ref_id, title, body) SELECT id * 4 + 3, 'question', id, question_title, question_statement || ' ' || coalesce((SELECT group_concat(text, ' ') FROM question_option WHERE question_id = question.id), '') FROM question WHERE id = new.question_id; "
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_option_update AFTER UPDATE ON question_option BEGIN '
+        'DELETE FROM search_index WHERE rowid = new.question_id * 4 + 3; '
+        "INSERT INTO search_index (rowid, kind, ref_id, title, body) SELECT id * 4 + 3, 'question', id, question_title, question_statement || ' ' || coalesce((SELECT group_concat(text, ' ') FROM question_option WHERE question_id = question.id), '') FROM question WHERE id = new.question_id; "
+        'END'
+    ),
+    (
+        'CREATE TRIGGER IF NOT EXISTS search_option_delete AFTER DELETE ON question_option BEGIN '
+        'DELETE FROM search_index WHERE rowid = old.question_id * 4 + 3; '
+        "INSERT INTO search_index (rowid, kind, ref_id, title, body) SELECT id * 4 + 3, 'question', id, question_title, question_statement || ' ' || coalesce((SELECT group_concat(text, ' ') FROM question_option WHERE question_id = question.id), '') FROM question WHERE id = old.question_id; "
+        'END'
+    ),
+]
+
+SOURCES = [
+    "SELECT id * 4 + 1, 'subject', id, name, coalesce(description, '') FROM subject",
+    "SELECT id * 4 + 2, 'chapter', id, name, coalesce(description, '') FROM chapter",
+    (
+        "SELECT id * 4 + 3, 'question', id, question_title, question_statement || ' ' || coalesce("
+        "(SELECT group_concat(text, ' ') FROM question_option WHERE question_id = question.id), '') FROM question"
+    ),
+]
+
+TRIGGERS = [
+    'search_subject_insert', 'search_subject_update', 'search_subject_delete',
+    'search_chapter_insert', 'search_chapter_update', 'search_chapter_delete',
+    'search_question_insert', 'search_question_update', 'search_question_delete',
+    'search_option_insert', 'search_option_update', 'search_option_delete',
+]
+
+
+def upgrade():
+    # FTS5 is SQLite only; other databases fall back to LIKE matching.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in SCHEMA:
+        op.execute(statement)
+    op.execute('DELETE FROM search_index')
+    for source in SOURCES:
+        op.execute(f'INSERT INTO search_index (rowid, kind, ref_id, title, body) {source}')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS search_index')
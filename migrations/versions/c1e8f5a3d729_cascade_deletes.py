@@ -0,0 +1,87 @@
+"""cascade deletes and deleted score archive
+
+Revision ID: c1e8f5a3d729
+Revises: b4d7e2f9a136
+Create Date: 2026-10-18 22:36:15.904471
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c1e8f5a3d729'
+down_revision = 'b4d7e2f9a136'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, referred table) for every foreign key that now cascades.
+CASCADES = [
+    ('chapter', 'subject_id', 'subject'),
+    ('quiz', 'chapter_id', 'chapter'),
+    ('question', 'quiz_id', 'quiz'),
+    ('question_option', 'question_id', 'question'),
+    ('score', 'quiz_id', 'quiz'),
+    ('user_subject_month_stat', 'subject_id', 'subject'),
+    ('quiz_stat', 'quiz_id', 'quiz'),
+    ('chapter_score_histogram', 'chapter_id', 'chapter'),
+    ('subject_day_stat', 'subject_id', 'subject'),
+]
+
+# SQLite foreign keys are unnamed; batch mode names them by this convention so
+# they can be dropped.
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _fk_name(table, column, referred):
+    if op.get_bind().dialect.name == 'sqlite':
+        return f'fk_{table}_{column}_{referred}'
+    return f'{table}_{column}_fkey'
+
+
+def _set_ondelete(ondelete):
+    # Rebuilding a table drops its triggers, and renaming one fails while the
+    # search triggers on other tables still refer to it, so set them aside.
+    conn = op.get_bind()
+    triggers = []
+    if conn.dialect.name == 'sqlite':
+        triggers = conn.execute(sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")).fetchall()
+        for name, _ in triggers:
+            op.execute(f'DROP TRIGGER {name}')
+
+    for table, column, referred in CASCADES:
+        name = _fk_name(table, column, referred)
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+    for _, sql in triggers:
+        op.execute(sql)
+
+
+def upgrade():
+    op.create_table('deleted_score',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_id', sa.Integer(), nullable=True),
+    sa.Column('subject_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('time_stamp_of_attempt', sa.DateTime(), nullable=False),
+    sa.Column('total_scored', sa.Integer(), nullable=False),
+    sa.Column('answers', sa.LargeBinary(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_deleted_score_user_id', 'deleted_score', ['user_id'], unique=False, if_not_exists=True)
+
+    _set_ondelete('CASCADE')
+
+
+def downgrade():
+    _set_ondelete(None)
+
+    op.drop_index('ix_deleted_score_user_id', table_name='deleted_score')
+    op.drop_table('deleted_score')
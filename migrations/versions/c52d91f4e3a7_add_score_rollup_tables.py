@@ -0,0 +1,59 @@
+"""add score rollup tables
+
+Revision ID: c52d91f4e3a7
+Revises: 8a4e6c0b2d51
+Create Date: 2026-10-18 14:05:33.470921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52d91f4e3a7'
+down_revision = '8a4e6c0b2d51'
+branch_labels = None
+depends_on = None
+
+
+# The app still runs db.create_all() at import, which may already have made
+# these (empty) tables before the migration runs.
+def upgrade():
+    op.create_table('user_subject_month_stat',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['subject_id'], ['subject.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'subject_id', 'month'),
+    if_not_exists=True
+    )
+    op.create_table('quiz_stat',
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('question_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id'], ),
+    sa.PrimaryKeyConstraint('quiz_id'),
+    if_not_exists=True
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        month = "to_char(score.time_stamp_of_attempt, 'YYYY-MM')"
+    else:
+        month = "strftime('%Y-%m', score.time_stamp_of_attempt)"
+    op.execute(
+        'INSERT INTO user_subject_month_stat (user_id, subject_id, month, attempts) '
+        f'SELECT score.user_id, chapter.subject_id, {month}, count(score.id) '
+        'FROM score JOIN quiz ON score.quiz_id = quiz.id JOIN chapter ON quiz.chapter_id = chapter.id '
+        f'GROUP BY score.user_id, chapter.subject_id, {month}'
+    )
+    op.execute(
+        'INSERT INTO quiz_stat (quiz_id, question_count) '
+        'SELECT quiz.id, count(question.id) FROM quiz LEFT OUTER JOIN question ON question.quiz_id = quiz.id '
+        'GROUP BY quiz.id'
+    )
+
+
+def downgrade():
+    op.drop_table('quiz_stat')
+    op.drop_table('user_subject_month_stat')
@@ -0,0 +1,31 @@
+"""add catalog version
+
+Revision ID: d6a2b8c4e913
+Revises: c1e8f5a3d729
+Create Date: 2026-10-18 23:12:40.518337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a2b8c4e913'
+down_revision = 'c1e8f5a3d729'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalog_version = op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('generation', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    if not op.get_bind().execute(sa.text('SELECT 1 FROM catalog_version')).first():
+        op.bulk_insert(catalog_version, [{'id': 1, 'generation': 0}])
+
+
+def downgrade():
+    op.drop_table('catalog_version')
@@ -0,0 +1,57 @@
+"""add admin analytics tables
+
+Revision ID: e7b3f2a81c64
+Revises: c52d91f4e3a7
+Create Date: 2026-10-18 16:22:09.118345
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3f2a81c64'
+down_revision = 'c52d91f4e3a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chapter_score_histogram',
+    sa.Column('chapter_id', sa.Integer(), nullable=False),
+    sa.Column('total_scored', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapter.id'], ),
+    sa.PrimaryKeyConstraint('chapter_id', 'total_scored'),
+    if_not_exists=True
+    )
+    op.create_table('subject_day_stat',
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.String(length=10), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['subject_id'], ['subject.id'], ),
+    sa.PrimaryKeyConstraint('subject_id', 'day'),
+    if_not_exists=True
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        day = "to_char(score.time_stamp_of_attempt, 'YYYY-MM-DD')"
+    else:
+        day = "strftime('%Y-%m-%d', score.time_stamp_of_attempt)"
+    op.execute(
+        'INSERT INTO chapter_score_histogram (chapter_id, total_scored, attempts) '
+        'SELECT quiz.chapter_id, score.total_scored, count(score.id) '
+        'FROM score JOIN quiz ON score.quiz_id = quiz.id '
+        'GROUP BY quiz.chapter_id, score.total_scored'
+    )
+    op.execute(
+        'INSERT INTO subject_day_stat (subject_id, day, attempts) '
+        f'SELECT chapter.subject_id, {day}, count(score.id) '
+        'FROM score JOIN quiz ON score.quiz_id = quiz.id JOIN chapter ON quiz.chapter_id = chapter.id '
+        f'GROUP BY chapter.subject_id, {day}'
+    )
+
+
+def downgrade():
+    op.drop_table('subject_day_stat')
+    op.drop_table('chapter_score_histogram')
@@ -0,0 +1,28 @@
+"""widen user password for pbkdf2 hashes
+
+Revision ID: f3a8c1d5b602
+Revises: d6a2b8c4e913
+Create Date: 2026-10-18 23:48:09.226713
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c1d5b602'
+down_revision = 'd6a2b8c4e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password', existing_type=sa.String(length=100), type_=sa.String(length=255),
+                              existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password', existing_type=sa.String(length=255), type_=sa.String(length=100),
+                              existing_nullable=False)
@@ -5,7 +5,7 @@ db = SQLAlchemy()
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(100), unique=True, nullable=False)
-    password = db.Column(db.String(100), nullable=False)  
+    password = db.Column(db.String(255), nullable=False)  
     is_admin = db.Column(db.Boolean, default=False)
     fullname = db.Column(db.String(150), nullable=False)
     dob = db.Column(db.Date, nullable=False)  
@@ -21,11 +21,15 @@ class Subject(db.Model):
 
 class Chapter(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
     
-    subject = db.relationship('Subject', backref=db.backref('chapters', lazy=True))
+    subject = db.relationship('Subject', backref=db.backref('chapters', lazy=True, passive_deletes=True))
+
+    __table_args__ = (
+        db.Index('ix_chapter_subject_id', 'subject_id'),
+    )
 
     def __repr__(self):
         return f'<Chapter {self.name}>'
@@ -33,12 +37,19 @@ class Chapter(db.Model):
 
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id', ondelete='CASCADE'), nullable=False)
     date_of_quiz = db.Column(db.Date, nullable=False)
     time_duration = db.Column(db.String(10), nullable=False)  
     remarks = db.Column(db.Text, nullable=True)
 
-    chapter = db.relationship('Chapter', backref=db.backref('quizzes', lazy=True))
+    chapter = db.relationship('Chapter', backref=db.backref('quizzes', lazy=True, passive_deletes=True))
+
+    # AUTOINCREMENT: a deleted quiz's id must not come back, since archived
+    # attempts and deleted_score still refer to it.
+    __table_args__ = (
+        db.Index('ix_quiz_chapter_id', 'chapter_id'),
+        {'sqlite_autoincrement': True},
+    )
 
     def __repr__(self):
         return f'<Quiz on {self.date_of_quiz}>'
@@ -46,31 +57,154 @@ class Quiz(db.Model):
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False)
     question_title = db.Column(db.String(200), nullable=False)
     question_statement = db.Column(db.Text, nullable=False)
-    option1 = db.Column(db.String(255), nullable=False)
-    option2 = db.Column(db.String(255), nullable=False)
-    option3 = db.Column(db.String(255), nullable=True)
-    option4 = db.Column(db.String(255), nullable=True)
-    correct_option = db.Column(db.String(10), nullable=False)  
+    # Bit p - 1 is set for each correct option position p; see grading.py.
+    correct_mask = db.Column(db.Integer, nullable=False, default=0)
     
-    quiz = db.relationship('Quiz', backref=db.backref('questions', lazy=True))
+    quiz = db.relationship('Quiz', backref=db.backref('questions', lazy=True, passive_deletes=True))
+
+    __table_args__ = (
+        db.Index('ix_question_quiz_id_id', 'quiz_id', 'id'),
+    )
+
+    def set_options(self, texts):
+        # Update rows in place: replacing the collection would insert the new
+        # (question_id, position) keys before deleting the old ones.
+        existing = {option.position: option for option in self.options}
+        for position, text in enumerate(texts, 1):
+            if position in existing:
+                existing[position].text = text
+            else:
+                self.options.append(QuestionOption(position=position, text=text))
+        for position, option in existing.items():
+            if position > len(texts):
+                self.options.remove(option)
 
     def __repr__(self):
         return f'<Question {self.question_statement[:50]}...>'
 
 
+class QuestionOption(db.Model):
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id', ondelete='CASCADE'), primary_key=True)
+    position = db.Column(db.SmallInteger, primary_key=True)
+    text = db.Column(db.String(255), nullable=False)
+
+    question = db.relationship('Question', backref=db.backref(
+        'options', lazy=True, order_by='QuestionOption.position', cascade='all, delete-orphan'
+    ))
+
+    def __repr__(self):
+        return f'<QuestionOption {self.question_id}.{self.position}>'
+
+
 class Score(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     time_stamp_of_attempt = db.Column(db.DateTime, nullable=False)
     total_scored = db.Column(db.Integer, nullable=False)
+    answers = db.Column(db.LargeBinary, nullable=True)
 
-    quiz = db.relationship('Quiz', backref=db.backref('scores', lazy=True))
+    quiz = db.relationship('Quiz', backref=db.backref('scores', lazy=True, passive_deletes=True))
     user = db.relationship('User', backref=db.backref('scores', lazy=True))
 
+    # AUTOINCREMENT: ids freed by archiving or deletion must not come back;
+    # the score archive and the leaderboard watermark rely on ids only growing.
+    __table_args__ = (
+        db.Index('ix_score_user_id_time_stamp', 'user_id', 'time_stamp_of_attempt'),
+        db.Index('ix_score_quiz_id_total_scored', 'quiz_id', 'total_scored'),
+        {'sqlite_autoincrement': True},
+    )
+
     def __repr__(self):
         return f'<Score {self.total_scored} by User {self.user_id}>'
 
+
+
+# Attempts at quizzes that have since been deleted; see deletion.py. The score,
+# quiz, chapter and subject ids are kept for reference only and no longer
+# resolve. original_score_id is not unique: score ids issued before migration
+# 9e4b7a2d6c18 gave Score AUTOINCREMENT may repeat.
+class DeletedScore(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    original_score_id = db.Column(db.Integer, nullable=False)
+    quiz_id = db.Column(db.Integer, nullable=False)
+    chapter_id = db.Column(db.Integer, nullable=True)
+    subject_id = db.Column(db.Integer, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    time_stamp_of_attempt = db.Column(db.DateTime, nullable=False)
+    total_scored = db.Column(db.Integer, nullable=False)
+    answers = db.Column(db.LargeBinary, nullable=True)
+    deleted_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_deleted_score_user_id', 'user_id'),
+    )
+
+    def __repr__(self):
+        return f'<DeletedScore {self.total_scored} by User {self.user_id}>'
+
+
+class UserSubjectMonthStat(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<UserSubjectMonthStat {self.user_id}/{self.subject_id}/{self.month}: {self.attempts}>'
+
+
+class QuizStat(db.Model):
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), primary_key=True)
+    question_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<QuizStat {self.quiz_id}: {self.question_count} questions>'
+
+
+class ChapterScoreHistogram(db.Model):
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id', ondelete='CASCADE'), primary_key=True)
+    total_scored = db.Column(db.Integer, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ChapterScoreHistogram {self.chapter_id} score {self.total_scored}: {self.attempts}>'
+
+
+class SubjectDayStat(db.Model):
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.String(10), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SubjectDayStat {self.subject_id}/{self.day}: {self.attempts}>'
+
+
+class CatalogVersion(db.Model):
+    # A single row whose generation every admin write to the catalog bumps, so
+    # each worker can tell when its cached copy is stale. scores_generation
+    # moves only when attempts are removed or regraded.
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    scores_generation = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<CatalogVersion {self.generation}>'
+
+
+class UserSession(db.Model):
+    id = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_user_session_user_id', 'user_id'),
+        db.Index('ix_user_session_expires_at', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f'<UserSession {self.id[:8]}... for User {self.user_id}>'
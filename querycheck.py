@@ -0,0 +1,93 @@
+from sqlalchemy import event
+
+from catalog import catalog
+from model import db, Subject, Quiz, Score, User
+
+
+# Listing pages walk their driving table on purpose; every other table they touch
+# (and every table on a lookup page) must be reached through an index. Pages
+# served from the catalog only look up its generation once it is loaded.
+ROUTES = [
+    ('admin_dashboard', '/admin_dashboard', {'subject'}, True),
+    ('quiz_management', '/quiz_manage', {'quiz'}, True),
+    ('admin_summary', '/admin/summary', {'subject', 'chapter', 'chapter_score_histogram', 'subject_day_stat'}, True),
+    ('get_chapters', '/get_chapters/{subject_id}', set(), True),
+    ('new_quiz', '/new_quiz', set(), True),
+    ('search', '/search?q=a', set(), True),
+    ('user_dashboard', '/user_dashboard', set(), False),
+    ('view_quiz', '/view_quiz/{quiz_id}', set(), False),
+    ('start_quiz', '/start_quiz/{quiz_id}', set(), False),
+    ('view_scores', '/scores', set(), False),
+    ('quiz_summary', '/summary', set(), False),
+    ('quiz_leaderboard', '/api/leaderboard/quiz/{quiz_id}', set(), False),
+    ('subject_leaderboard', '/api/leaderboard/subject/{subject_id}', set(), False),
+]
+
+
+def unindexed_scans(plan, allowed):
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        if not detail.startswith('SCAN ') or 'INDEX' in detail:
+            continue
+        table = detail.split()[1]
+        if table not in allowed:
+            scans.append(detail)
+    return scans
+
+
+def check_routes(app):
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            raise RuntimeError('EXPLAIN QUERY PLAN check only runs against SQLite')
+
+        subject = Subject.query.first()
+        quiz = Quiz.query.first()
+        score = Score.query.first()
+        user = db.session.get(User, score.user_id) if score else User.query.first()
+        admin = User.query.filter_by(is_admin=True).first()
+        if not (subject and quiz and user and admin):
+            raise RuntimeError('Seed at least one subject, quiz, user and admin before running the check')
+        ids = {'subject_id': subject.id, 'quiz_id': quiz.id}
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                captured.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        results = []
+        try:
+            # The catalog reads subjects, chapters and quizzes whole, once per
+            # generation; check that load on its own so no page is charged for it.
+            catalog.clear()
+            catalog.get()
+            results += _explain('catalog', captured, {'subject', 'chapter', 'quiz'})
+
+            clients = {}
+            for as_admin, account in ((True, admin), (False, user)):
+                clients[as_admin] = app.test_client()
+                with clients[as_admin].session_transaction() as sess:
+                    sess['user_id'] = account.id
+
+            for endpoint, path, allowed, as_admin in ROUTES:
+                del captured[:]
+                clients[as_admin].get(path.format(**ids))
+                results += _explain(endpoint, captured, allowed)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+    return results
+
+
+def _explain(endpoint, captured, allowed):
+    results = []
+    for statement, parameters in list(captured):
+        plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        results.append({
+            'endpoint': endpoint,
+            'statement': ' '.join(statement.split()),
+            'plan': [row[-1] for row in plan],
+            'unindexed': unindexed_scans(plan, allowed),
+        })
+    return results
@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from itertools import groupby
+
+from catalog import catalog
+from grading import AnswerKey
+from model import db, Question, QuestionOption
+
+
+CachedQuestion = namedtuple('CachedQuestion', 'id question_title question_statement options correct_mask')
+
+
+# Everything a student's browser needs to render the quiz, and nothing it must not see.
+# Answers go back as 1-based positions into ``options``.
+PAYLOAD_FIELDS = ('id', 'question_title', 'question_statement', 'options')
+
+
+class QuizSnapshot(namedtuple('QuizSnapshot', 'quiz_id questions answer_key payload payload_gzip etag loaded_at')):
+    __slots__ = ()
+
+
+def build_payload(quiz_id, questions):
+    body = json.dumps({
+        'quiz_id': quiz_id,
+        'questions': [
+            dict({field: getattr(q, field) for field in PAYLOAD_FIELDS}, multiple=q.correct_mask.bit_count() > 1)
+            for q in questions
+        ],
+    }, separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    return body, gzip.compress(body, compresslevel=6, mtime=0), etag
+
+
+def load_snapshot(quiz_id):
+    rows = (
+        Question.query
+        .with_entities(Question.id, Question.question_title, Question.question_statement, Question.correct_mask)
+        .filter_by(quiz_id=quiz_id)
+        .order_by(Question.id)
+        .all()
+    )
+    option_rows = (
+        db.session.query(QuestionOption.question_id, QuestionOption.text)
+        .join(Question, QuestionOption.question_id == Question.id)
+        .filter(Question.quiz_id == quiz_id)
+        .order_by(QuestionOption.question_id, QuestionOption.position)
+        .all()
+    )
+    options = {
+        question_id: tuple(row.text for row in group)
+        for question_id, group in groupby(option_rows, key=lambda row: row.question_id)
+    }
+    questions = tuple(
+        CachedQuestion(row.id, row.question_title, row.question_statement, options.get(row.id, ()), row.correct_mask)
+        for row in rows
+    )
+    answer_key = AnswerKey.from_questions(questions)
+    payload, payload_gzip, etag = build_payload(quiz_id, questions)
+    return QuizSnapshot(quiz_id, questions, answer_key, payload, payload_gzip, etag, time.monotonic())
+
+
+class QuizCache:
+    def __init__(self, max_size=256, ttl=300, loader=load_snapshot):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._generation = 0
+
+    def get(self, quiz_id):
+        # Edits made through another worker bump the shared catalog generation;
+        # snapshots loaded before it are stale here too.
+        catalog_generation = catalog.get().generation
+        with self._lock:
+            snapshot = self._fresh(quiz_id, catalog_generation)
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+            key_lock = self._loading.setdefault(quiz_id, threading.Lock())
+
+        # Only one thread per quiz goes to the database; the rest wait and reuse it.
+        with key_lock:
+            with self._lock:
+                snapshot = self._fresh(quiz_id, catalog_generation)
+            if snapshot is None:
+                generation = self._generation
+                snapshot = self.loader(quiz_id)
+                with self._lock:
+                    # An invalidation that raced the load wins; serve the rows but don't keep them.
+                    if generation != self._generation:
+                        self._loading.pop(quiz_id, None)
+                        return snapshot
+                    self._entries[quiz_id] = (snapshot, catalog_generation)
+                    self._entries.move_to_end(quiz_id)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+        with self._lock:
+            self._loading.pop(quiz_id, None)
+        return snapshot
+
+    def _fresh(self, quiz_id, catalog_generation):
+        entry = self._entries.get(quiz_id)
+        if entry is None:
+            return None
+        snapshot, loaded_generation = entry
+        if loaded_generation < catalog_generation or time.monotonic() - snapshot.loaded_at > self.ttl:
+            del self._entries[quiz_id]
+            return None
+        self._entries.move_to_end(quiz_id)
+        return snapshot
+
+    def invalidate(self, *quiz_ids):
+        with self._lock:
+            self._generation += 1
+            for quiz_id in quiz_ids:
+                self._entries.pop(quiz_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+quiz_cache = QuizCache()
+
+
+def init_app(app):
+    quiz_cache.max_size = app.config.get('QUIZ_CACHE_SIZE', quiz_cache.max_size)
+    quiz_cache.ttl = app.config.get('QUIZ_CACHE_TTL', quiz_cache.ttl)
@@ -0,0 +1,111 @@
+import multiprocessing
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sqlalchemy import update
+
+import analytics
+import stats
+from model import db, Score
+from quiz_cache import load_snapshot
+
+
+RescoreResult = namedtuple('RescoreResult', 'quiz_id scanned changed seconds')
+
+_app = None
+
+
+def quizzes_with_answers():
+    rows = (
+        db.session.query(Score.quiz_id)
+        .filter(Score.answers.isnot(None))
+        .distinct()
+        .order_by(Score.quiz_id)
+        .all()
+    )
+    return [row.quiz_id for row in rows]
+
+
+def iter_chunks(quiz_id, chunk_size):
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(Score.id, Score.total_scored, Score.answers)
+            .filter(Score.quiz_id == quiz_id, Score.answers.isnot(None), Score.id > last_id)
+            .order_by(Score.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield rows
+
+
+def rescore_quiz(quiz_id, chunk_size=5000, progress=None):
+    started = time.perf_counter()
+    answer_key = load_snapshot(quiz_id).answer_key
+    chapter_id, _ = stats.quiz_lineage([quiz_id]).get(quiz_id, (None, None))
+    scanned = changed = 0
+    for rows in iter_chunks(quiz_id, chunk_size):
+        totals = np.rint(answer_key.grade_packed([row.answers for row in rows]).totals).astype(np.int64)
+        changes = [(row, int(total)) for row, total in zip(rows, totals) if row.total_scored != total]
+        if changes:
+            db.session.execute(update(Score), [{'id': row.id, 'total_scored': total} for row, total in changes])
+            if chapter_id is not None:
+                analytics.record_rescores(chapter_id, [(row.total_scored, total) for row, total in changes])
+        db.session.commit()
+        scanned += len(rows)
+        changed += len(changes)
+        if progress is not None:
+            progress(len(rows))
+    return RescoreResult(quiz_id, scanned, changed, time.perf_counter() - started)
+
+
+def _init_worker():
+    # Connections inherited across fork must not be reused by the child.
+    with _app.app_context():
+        db.engine.dispose(close=False)
+
+
+def _rescore_in_worker(quiz_id, chunk_size):
+    with _app.app_context():
+        return rescore_quiz(quiz_id, chunk_size)
+
+
+def run(app, quiz_ids=None, chunk_size=5000, workers=1, report=print):
+    global _app
+    _app = app
+    started = time.perf_counter()
+    scanned = changed = 0
+
+    def progress(count):
+        nonlocal scanned
+        scanned += count
+        elapsed = time.perf_counter() - started
+        report(f'  {scanned} attempts regraded, {scanned / elapsed:,.0f} attempts/sec')
+
+    with app.app_context():
+        quiz_ids = list(quiz_ids or quizzes_with_answers())
+        if workers <= 1:
+            for quiz_id in quiz_ids:
+                result = rescore_quiz(quiz_id, chunk_size, progress)
+                changed += result.changed
+                report(f'quiz {quiz_id}: {result.scanned} attempts, {result.changed} changed')
+        else:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+                futures = [pool.submit(_rescore_in_worker, quiz_id, chunk_size) for quiz_id in quiz_ids]
+                for future in as_completed(futures):
+                    result = future.result()
+                    changed += result.changed
+                    progress(result.scanned)
+                    report(f'quiz {result.quiz_id}: {result.scanned} attempts, {result.changed} changed')
+
+    elapsed = time.perf_counter() - started
+    rate = scanned / elapsed if elapsed else 0.0
+    report(f'Regraded {scanned} attempts across {len(quiz_ids)} quizzes in {elapsed:.2f}s '
+           f'({rate:,.0f} attempts/sec), {changed} totals updated')
+    return scanned, changed
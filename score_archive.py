@@ -0,0 +1,312 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, func, select
+
+import analytics
+import stats
+from model import db, Score, Quiz, Chapter, UserSubjectMonthStat, ChapterScoreHistogram, SubjectDayStat
+
+
+# One row per archived attempt. Segments are sorted by (user_id, time, id) so a
+# student's history is a binary search away; per-quiz reads scan one column.
+SEGMENT = np.dtype([
+    ('id', '<i8'), ('user_id', '<i4'), ('quiz_id', '<i4'), ('time', '<i8'), ('score', '<i4'),
+])
+EPOCH = datetime(1970, 1, 1)
+MICROSECONDS_PER_DAY = 86400 * 10 ** 6
+
+ArchiveResult = namedtuple('ArchiveResult', 'month rows segment bytes seconds')
+ArchivedScore = namedtuple('ArchivedScore', 'id quiz_id user_id total_scored time_stamp_of_attempt')
+
+_segment_name = re.compile(r'^scores-(\d{4}-\d{2})-(\d{3})\.npy$')
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def to_micros(timestamp):
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros):
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+def month_bounds(month):
+    start = datetime.strptime(month, '%Y-%m')
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+class ScoreArchive:
+    """Closed months of Score as append-only, memory-mapped segment files.
+
+    `flask archive-scores` writes a month's attempts to a new segment and then
+    deletes them from Score in the same transaction. Archived attempts keep
+    counting in the rollups; readers that go to Score directly (a student's
+    history, leaderboards, rebuilds) merge in the segments through this class.
+    Attempts at quizzes deleted since stay in their segments but are skipped.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._segments = ()
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.path = app.config.get('SCORE_ARCHIVE_DIR') or os.path.join(app.instance_path, 'score_archive')
+        self._segments = ()
+        self._mtime = None
+
+    def segments(self):
+        """(month, array) for every segment, oldest first; rescanned when the directory changes."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return ()
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    segments = []
+                    for name in sorted(os.listdir(self.path)):
+                        match = _segment_name.match(name)
+                        if match:
+                            segments.append((match.group(1), np.load(os.path.join(self.path, name), mmap_mode='r')))
+                    self._segments = tuple(segments)
+                    self._mtime = mtime
+        return self._segments
+
+    def history(self, user_id, quiz_ids=None, before=None, limit=None):
+        """A student's archived attempts, newest first.
+
+        quiz_ids limits them to quizzes that still exist and before is a
+        (timestamp, id) keyset cursor, as on the scores page.
+        """
+        known = np.fromiter(quiz_ids, dtype='<i4') if quiz_ids is not None else None
+        parts = []
+        for _, segment in self.segments():
+            users = segment['user_id']
+            part = segment[np.searchsorted(users, user_id, 'left'):np.searchsorted(users, user_id, 'right')]
+            if before is not None:
+                cutoff, before_id = to_micros(before[0]), before[1]
+                part = part[(part['time'] < cutoff) | ((part['time'] == cutoff) & (part['id'] < before_id))]
+            if known is not None:
+                part = part[np.isin(part['quiz_id'], known)]
+            parts.append(part[-limit:] if limit else part)
+        if not parts:
+            return []
+        rows = np.concatenate(parts)
+        rows = rows[np.lexsort((-rows['id'], -rows['time']))]
+        return [_archived(row) for row in (rows[:limit] if limit else rows)]
+
+    def rows(self, quiz_ids, chunk_size=1000):
+        """Every archived attempt at the given quizzes, in lists of up to chunk_size, id order within a segment."""
+        known = np.fromiter(quiz_ids, dtype='<i4')
+        for _, segment in self.segments():
+            part = segment[np.isin(segment['quiz_id'], known)]
+            part = part[np.argsort(part['id'], kind='stable')]
+            for start in range(0, len(part), chunk_size):
+                yield [_archived(row) for row in part[start:start + chunk_size]]
+
+    def quiz_results(self, quiz_id):
+        """Every archived attempt at one quiz as (user_id, score, timestamp)."""
+        for _, segment in self.segments():
+            part = segment[segment['quiz_id'] == quiz_id]
+            for user_id, score, micros in zip(part['user_id'].tolist(), part['score'].tolist(), part['time'].tolist()):
+                yield user_id, score, from_micros(micros)
+
+    def rollup_counts(self, quiz_ids=None):
+        """What the archived attempts contribute to each rollup table.
+
+        Returns Counters keyed like the rows of UserSubjectMonthStat,
+        ChapterScoreHistogram and SubjectDayStat, skipping deleted quizzes.
+        """
+        months, scores, days = Counter(), Counter(), Counter()
+        wanted = np.fromiter(quiz_ids, dtype='<i4') if quiz_ids is not None else None
+        grouped = []
+        for month, segment in self.segments():
+            if wanted is not None:
+                segment = segment[np.isin(segment['quiz_id'], wanted)]
+            quiz = segment['quiz_id'].astype(np.int64) << 32
+            # Pack each grouping key into one int64 so numpy can count them.
+            grouped.append((
+                month,
+                np.unique(quiz | segment['user_id'], return_counts=True),
+                np.unique(quiz | segment['score'].astype(np.int64), return_counts=True),
+                np.unique(quiz | (segment['time'] // MICROSECONDS_PER_DAY), return_counts=True),
+            ))
+        quizzes = {int(key) >> 32 for _, *keys in grouped for packed, _ in keys for key in packed}
+        lineage = stats.quiz_lineage(quizzes) if quizzes else {}
+
+        def split(packed, counts):
+            for key, count in zip(packed.tolist(), counts.tolist()):
+                if key >> 32 in lineage:
+                    yield lineage[key >> 32], key & 0xFFFFFFFF, count
+
+        for month, by_user, by_score, by_day in grouped:
+            for (_, subject_id), user_id, count in split(*by_user):
+                months[(user_id, subject_id, month)] += count
+            for (chapter_id, _), score, count in split(*by_score):
+                scores[(chapter_id, score)] += count
+            for (_, subject_id), day, count in split(*by_day):
+                days[(subject_id, (EPOCH + timedelta(days=day)).strftime('%Y-%m-%d'))] += count
+        return months, scores, days
+
+    def add_to_rollups(self, quiz_ids=None, sign=1):
+        months, scores, days = self.rollup_counts(quiz_ids)
+        stats.upsert_increments(
+            UserSubjectMonthStat,
+            [
+                {'user_id': user_id, 'subject_id': subject_id, 'month': month, 'attempts': sign * attempts}
+                for (user_id, subject_id, month), attempts in months.items()
+            ],
+            ['user_id', 'subject_id', 'month'],
+            ['attempts'],
+        )
+        analytics.apply_deltas(
+            {key: sign * attempts for key, attempts in scores.items()},
+            {key: sign * attempts for key, attempts in days.items()},
+        )
+        if sign < 0:
+            db.session.execute(delete(UserSubjectMonthStat).where(UserSubjectMonthStat.attempts <= 0))
+            db.session.execute(delete(ChapterScoreHistogram).where(ChapterScoreHistogram.attempts <= 0))
+            db.session.execute(delete(SubjectDayStat).where(SubjectDayStat.attempts <= 0))
+        return sum(months.values())
+
+    def forget_quizzes(self, quiz_ids):
+        """Take archived attempts at quizzes about to be deleted back out of the rollups."""
+        quiz_ids = list(quiz_ids)
+        return self.add_to_rollups(quiz_ids, sign=-1) if quiz_ids and self.segments() else 0
+
+    def closed_months(self, before):
+        month = stats.month_expr(Score.time_stamp_of_attempt)
+        return db.session.execute(
+            select(month).where(Score.time_stamp_of_attempt < before).distinct().order_by(month)
+        ).scalars().all()
+
+    def archive(self, before, verify=False, report=None, batch_size=5000):
+        """Archive every month of Score that ends on or before `before`, one transaction per month."""
+        os.makedirs(self.path, exist_ok=True)
+        results = []
+        for month in self.closed_months(before):
+            result = self.archive_month(month, verify, batch_size)
+            if report:
+                report(f'{result.month}: {result.rows} attempts -> {result.segment} ({result.bytes} bytes)')
+            results.append(result)
+        return results
+
+    def archive_month(self, month, verify=False, batch_size=5000):
+        started = time.perf_counter()
+        start, end = month_bounds(month)
+        in_month = (Score.time_stamp_of_attempt >= start, Score.time_stamp_of_attempt < end)
+
+        # A run that wrote its segment but died before committing left the rows in both places.
+        archived = [segment['id'] for segment_month, segment in self.segments() if segment_month == month]
+        if archived:
+            for ids in _batches(np.concatenate(archived).tolist(), batch_size):
+                db.session.execute(delete(Score).where(Score.id.in_(ids), *in_month))
+
+        rows = db.session.execute(
+            select(Score.id, Score.user_id, Score.quiz_id, Score.time_stamp_of_attempt, Score.total_scored)
+            .where(*in_month)
+            .order_by(Score.user_id, Score.time_stamp_of_attempt, Score.id)
+        ).all()
+        if not rows:
+            db.session.commit()
+            return ArchiveResult(month, 0, None, 0, time.perf_counter() - started)
+
+        segment = np.empty(len(rows), dtype=SEGMENT)
+        segment['id'] = [row.id for row in rows]
+        segment['user_id'] = [row.user_id for row in rows]
+        segment['quiz_id'] = [row.quiz_id for row in rows]
+        segment['time'] = [to_micros(row.time_stamp_of_attempt) for row in rows]
+        segment['score'] = [row.total_scored for row in rows]
+
+        users = set(segment['user_id'].tolist())
+        quizzes = set(segment['quiz_id'].tolist())
+        expected = self._snapshot(users, quizzes) if verify else None
+
+        name = f'scores-{month}-{len(archived):03d}.npy'
+        path = os.path.join(self.path, name)
+        partial = path + '.tmp'
+        with open(partial, 'wb') as output:
+            np.save(output, segment)
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(partial, path)
+        try:
+            for ids in _batches(segment['id'].tolist(), batch_size):
+                db.session.execute(delete(Score).where(Score.id.in_(ids)))
+            if verify and self._snapshot(users, quizzes) != expected:
+                raise ArchiveError(f'{month}: archived attempts read back differently from Score')
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            os.remove(path)
+            raise
+        return ArchiveResult(month, len(rows), name, os.path.getsize(path), time.perf_counter() - started)
+
+    def _snapshot(self, users, quizzes):
+        # What the scores page and the leaderboards would read for these
+        # students and quizzes, from Score and the segments together.
+        history = {}
+        for user_id in users:
+            live = db.session.execute(
+                select(Score.id, Score.quiz_id, Score.user_id, Score.total_scored, Score.time_stamp_of_attempt)
+                .where(Score.user_id == user_id)
+            ).all()
+            history[user_id] = sorted({tuple(row) for row in live} | {tuple(row) for row in self.history(user_id)})
+        results = {}
+        for quiz_id in quizzes:
+            live = db.session.execute(
+                select(Score.user_id, Score.total_scored, Score.time_stamp_of_attempt).where(Score.quiz_id == quiz_id)
+            ).all()
+            results[quiz_id] = sorted([tuple(row) for row in live] + list(self.quiz_results(quiz_id)))
+        return history, results, self._merged_rollups()
+
+    def _merged_rollups(self):
+        # The rollup tables as a rebuild would compute them from Score plus the segments.
+        months, scores, days = self.rollup_counts()
+        month, day = stats.month_expr(Score.time_stamp_of_attempt), stats.day_expr(Score.time_stamp_of_attempt)
+        lineage = (Score.quiz_id == Quiz.id, Quiz.chapter_id == Chapter.id)
+        for counter, columns in (
+            (months, (Score.user_id, Chapter.subject_id, month)),
+            (scores, (Quiz.chapter_id, Score.total_scored)),
+            (days, (Chapter.subject_id, day)),
+        ):
+            counter.update({
+                tuple(row[:-1]): row[-1]
+                for row in db.session.execute(
+                    select(*columns, func.count(Score.id)).where(*lineage).group_by(*columns)
+                )
+            })
+        return months, scores, days
+
+    def stats(self):
+        segments = self.segments()
+        return {
+            'segments': len(segments),
+            'months': len({month for month, _ in segments}),
+            'rows': sum(len(segment) for _, segment in segments),
+            'bytes': sum(segment.nbytes for _, segment in segments),
+        }
+
+
+def _archived(row):
+    return ArchivedScore(int(row['id']), int(row['quiz_id']), int(row['user_id']), int(row['score']),
+                         from_micros(row['time']))
+
+
+def _batches(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+score_archive = ScoreArchive()
@@ -0,0 +1,248 @@
+import atexit
+import base64
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import analytics
+import stats
+from model import db, Score
+
+
+class ScoreWriter:
+    def __init__(self, max_queue=10000, batch_size=500, flush_interval=0.2, put_timeout=0.5, retries=3):
+        self.app = None
+        self.enabled = True
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self.spool_path = None
+        self.dead_letter_path = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.sync_writes = 0
+        self.spooled = 0
+        self.dead_lettered = 0
+        self.flush_ms_total = 0.0
+        self.flush_ms_last = 0.0
+        self.flush_ms_max = 0.0
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('SCORE_WRITER_ASYNC', True)
+        self.max_queue = app.config.get('SCORE_WRITER_QUEUE_SIZE', self.max_queue)
+        self.batch_size = app.config.get('SCORE_WRITER_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('SCORE_WRITER_FLUSH_INTERVAL', self.flush_interval)
+        self.put_timeout = app.config.get('SCORE_WRITER_PUT_TIMEOUT', self.put_timeout)
+        self.spool_path = os.path.join(app.instance_path, 'score_spool.jsonl')
+        self.dead_letter_path = os.path.join(app.instance_path, 'score_dead_letter.jsonl')
+        atexit.register(self.shutdown)
+
+    def submit(self, quiz_id, user_id, total_scored, answers=None, time_stamp_of_attempt=None):
+        row = {
+            'quiz_id': quiz_id,
+            'user_id': user_id,
+            'time_stamp_of_attempt': time_stamp_of_attempt or datetime.utcnow(),
+            'total_scored': total_scored,
+            'answers': answers,
+        }
+        if not self.enabled:
+            self._write_sync([row])
+            return row
+
+        self._ensure_started()
+        try:
+            # Backpressure: wait briefly for room, then make this request pay for its own write.
+            self._queue.put(row, timeout=self.put_timeout)
+            with self._metrics_lock:
+                self.enqueued += 1
+        except queue.Full:
+            self._write_sync([row])
+        return row
+
+    def _ensure_started(self):
+        # Threads don't survive fork, so each gunicorn worker starts its own writer.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._stop.clear()
+            self.replay_spool()
+            self._thread = threading.Thread(target=self._run, name='score-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._drain(block=True)
+            if batch:
+                self._flush(batch)
+                self._done(batch)
+
+    def _done(self, batch):
+        for _ in batch:
+            self._queue.task_done()
+
+    def _drain(self, block):
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _flush(self, batch):
+        for attempt in range(self.retries):
+            try:
+                self._write(batch)
+                return
+            except OperationalError:
+                time.sleep(0.05 * (2 ** attempt))
+            except IntegrityError:
+                if len(batch) == 1:
+                    self.app.logger.warning('Score row for quiz %s rejected, dead-lettering it', batch[0]['quiz_id'])
+                    self._dead_letter(batch)
+                    return
+                # Retrying the batch would fail the same way: write the rows one by
+                # one so only those the database rejects are set aside.
+                for row in batch:
+                    self._flush([row])
+                return
+            except Exception:
+                self.app.logger.exception('Score batch of %d rows failed, spooling to disk', len(batch))
+                break
+        self._spool(batch)
+
+    def _write(self, rows):
+        started = time.perf_counter()
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(Score), rows)
+                lineage = stats.quiz_lineage(row['quiz_id'] for row in rows)
+                stats.record_scores(rows, lineage)
+                analytics.record_scores(rows, lineage)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._metrics_lock:
+            self.written += len(rows)
+            self.batches += 1
+            self.flush_ms_last = elapsed
+            self.flush_ms_total += elapsed
+            self.flush_ms_max = max(self.flush_ms_max, elapsed)
+
+    def _write_sync(self, rows):
+        with self._metrics_lock:
+            self.sync_writes += len(rows)
+        self._flush(rows)
+
+    def _spool(self, rows):
+        self._append(self.spool_path, rows)
+        with self._metrics_lock:
+            self.spooled += len(rows)
+
+    def _dead_letter(self, rows):
+        # Rows the database will never take (a quiz deleted while they were
+        # queued, say) are kept for inspection but never replayed.
+        self._append(self.dead_letter_path, rows)
+        with self._metrics_lock:
+            self.dead_lettered += len(rows)
+
+    def _append(self, path, rows):
+        with self._metrics_lock:
+            with open(path, 'a', encoding='utf-8') as output:
+                for row in rows:
+                    record = dict(
+                        row,
+                        time_stamp_of_attempt=row['time_stamp_of_attempt'].isoformat(),
+                        answers=base64.b64encode(row['answers']).decode('ascii') if row['answers'] is not None else None,
+                    )
+                    output.write(json.dumps(record) + '\n')
+                output.flush()
+                os.fsync(output.fileno())
+
+    def replay_spool(self):
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return 0
+        replay_path = self.spool_path + '.replay'
+        try:
+            os.replace(self.spool_path, replay_path)
+        except FileNotFoundError:
+            return 0
+        with open(replay_path, encoding='utf-8') as spool:
+            rows = [json.loads(line) for line in spool if line.strip()]
+        for row in rows:
+            row['time_stamp_of_attempt'] = datetime.fromisoformat(row['time_stamp_of_attempt'])
+            row['answers'] = base64.b64decode(row['answers']) if row.get('answers') is not None else None
+        for start in range(0, len(rows), self.batch_size):
+            self._flush(rows[start:start + self.batch_size])
+        os.remove(replay_path)
+        return len(rows)
+
+    def flush(self):
+        if self._queue is None:
+            return
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                break
+            self._flush(batch)
+            self._done(batch)
+        # A batch the writer thread picked up just before us may still be in flight.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._queue.join()
+
+    def shutdown(self):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.flush_interval * 5)
+        # Whatever is still queued goes to the database, or to the spool if that fails.
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                break
+            self._flush(batch)
+        self._thread = None
+
+    def metrics(self):
+        with self._metrics_lock:
+            return {
+                'enabled': self.enabled,
+                'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+                'max_queue': self.max_queue,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'batches': self.batches,
+                'sync_writes': self.sync_writes,
+                'spooled': self.spooled,
+                'dead_lettered': self.dead_lettered,
+                'flush_ms_last': round(self.flush_ms_last, 3),
+                'flush_ms_avg': round(self.flush_ms_total / self.batches, 3) if self.batches else 0.0,
+                'flush_ms_max': round(self.flush_ms_max, 3),
+            }
+
+
+score_writer = ScoreWriter()
@@ -0,0 +1,196 @@
+import re
+from collections import namedtuple
+
+from markupsafe import Markup, escape
+from sqlalchemy import func, literal, or_, select, text, union_all
+
+from model import db, Subject, Chapter, Question, QuestionOption
+
+
+# One FTS5 row per subject, chapter and question. The rowid encodes the source
+# (id * 4 + kind) so triggers replace a row by primary key instead of scanning
+# the index for it.
+KINDS = {'subject': 1, 'chapter': 2, 'question': 3}
+
+SOURCES = {
+    'subject': "SELECT id * 4 + 1, 'subject', id, name, coalesce(description, '') FROM subject",
+    'chapter': "SELECT id * 4 + 2, 'chapter', id, name, coalesce(description, '') FROM chapter",
+    'question': (
+        "SELECT id * 4 + 3, 'question', id, question_title, question_statement || ' ' || coalesce("
+        "(SELECT group_concat(text, ' ') FROM question_option WHERE question_id = question.id), '') FROM question"
+    ),
+}
+
+SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "kind UNINDEXED, ref_id UNINDEXED, title, body, tokenize = 'unicode61 remove_diacritics 2')",
+]
+for _table in ('subject', 'chapter'):
+    _row = f'{{0}}.id * 4 + {KINDS[_table]}'
+    SCHEMA += [
+        f"CREATE TRIGGER IF NOT EXISTS search_{_table}_insert AFTER INSERT ON {_table} BEGIN "
+        f"INSERT INTO search_index (rowid, kind, ref_id, title, body) {SOURCES[_table]} WHERE id = new.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS search_{_table}_update AFTER UPDATE ON {_table} BEGIN "
+        f"DELETE FROM search_index WHERE rowid = {_row.format('old')}; "
+        f"INSERT INTO search_index (rowid, kind, ref_id, title, body) {SOURCES[_table]} WHERE id = new.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS search_{_table}_delete AFTER DELETE ON {_table} BEGIN "
+        f"DELETE FROM search_index WHERE rowid = {_row.format('old')}; END",
+    ]
+# A question's row also carries its option texts, so option changes re-index it.
+_refresh_question = (
+    "DELETE FROM search_index WHERE rowid = {0} * 4 + 3; "
+    "INSERT INTO search_index (rowid, kind, ref_id, title, body) " + SOURCES['question'] + " WHERE id = {0}; "
+)
+SCHEMA += [
+    "CREATE TRIGGER IF NOT EXISTS search_question_insert AFTER INSERT ON question BEGIN "
+    + _refresh_question.format('new.id') + "END",
+    "CREATE TRIGGER IF NOT EXISTS search_question_update AFTER UPDATE ON question BEGIN "
+    "DELETE FROM search_index WHERE rowid = old.id * 4 + 3; " + _refresh_question.format('new.id') + "END",
+    "CREATE TRIGGER IF NOT EXISTS search_question_delete AFTER DELETE ON question BEGIN "
+    "DELETE FROM search_index WHERE rowid = old.id * 4 + 3; END",
+    "CREATE TRIGGER IF NOT EXISTS search_option_insert AFTER INSERT ON question_option BEGIN "
+    + _refresh_question.format('new.question_id') + "END",
+    "CREATE TRIGGER IF NOT EXISTS search_option_update AFTER UPDATE ON question_option BEGIN "
+    + _refresh_question.format('new.question_id') + "END",
+    "CREATE TRIGGER IF NOT EXISTS search_option_delete AFTER DELETE ON question_option BEGIN "
+    + _refresh_question.format('old.question_id') + "END",
+]
+
+# Title matches count for more than body matches (kind and ref_id get no weight).
+RANK = 'bm25(search_index, 0.0, 0.0, 5.0, 1.0)'
+# Control characters can't appear in the indexed text, so they mark highlights
+# safely until the snippet has been HTML-escaped.
+_OPEN, _CLOSE = '\x02', '\x03'
+
+SearchHit = namedtuple('SearchHit', 'kind id title snippet subject_id quiz_id')
+
+_terms = re.compile(r'\w+', re.UNICODE)
+
+
+# Engines known to have the index, so the check runs once per process.
+_installed = set()
+
+
+def available():
+    """True when the FTS5 index exists; until it does, search falls back to LIKE."""
+    if db.engine.url in _installed:
+        return True
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    if db.session.execute(text("PRAGMA table_info('search_index')")).first() is None:
+        return False
+    _installed.add(db.engine.url)
+    return True
+
+
+def install():
+    for statement in SCHEMA:
+        db.session.execute(text(statement))
+    db.session.commit()
+    _installed.add(db.engine.url)
+
+
+def rebuild():
+    install()
+    db.session.execute(text('DELETE FROM search_index'))
+    for source in SOURCES.values():
+        db.session.execute(text(f'INSERT INTO search_index (rowid, kind, ref_id, title, body) {source}'))
+    db.session.execute(text("INSERT INTO search_index (search_index) VALUES ('optimize')"))
+    db.session.commit()
+    return db.session.execute(text('SELECT count(*) FROM search_index')).scalar()
+
+
+def match_expression(query):
+    # Quote every term so FTS5 operators in user input are just words; the
+    # last term is a prefix so results show up while a word is half typed.
+    terms = _terms.findall(query)
+    if not terms:
+        return None
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def highlight(snippet):
+    return Markup(str(escape(snippet)).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+
+def search(query, page=1, page_size=20, kinds=None):
+    """Return one page of hits, best first, and whether another page follows."""
+    offset = (page - 1) * page_size
+    if available():
+        rows = _search_fts(query, kinds, page_size + 1, offset)
+    else:
+        rows = _search_like(query, kinds, page_size + 1, offset)
+    has_next = len(rows) > page_size
+    return _hits(rows[:page_size]), has_next
+
+
+def _search_fts(query, kinds, limit, offset):
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    sql = (
+        f"SELECT kind, ref_id, title, snippet(search_index, 3, '{_OPEN}', '{_CLOSE}', '…', 16) AS snippet "
+        'FROM search_index WHERE search_index MATCH :expression'
+    )
+    params = {'expression': expression, 'limit': limit, 'offset': offset}
+    if kinds:
+        sql += ' AND kind IN (' + ', '.join(f':kind{i}' for i in range(len(kinds))) + ')'
+        params.update({f'kind{i}': kind for i, kind in enumerate(kinds)})
+    sql += f' ORDER BY {RANK} LIMIT :limit OFFSET :offset'
+    return [tuple(row) for row in db.session.execute(text(sql), params)]
+
+
+def _search_like(query, kinds, limit, offset):
+    # Unranked fallback for databases without FTS5: every term must appear
+    # somewhere in the row, listed by kind and id.
+    terms = _terms.findall(query)
+    if not terms:
+        return []
+    options = (
+        select(func.coalesce(func.string_agg(QuestionOption.text, ' ') if db.engine.dialect.name == 'postgresql'
+                             else func.group_concat(QuestionOption.text, ' '), ''))
+        .where(QuestionOption.question_id == Question.id)
+        .scalar_subquery()
+    )
+    sources = {
+        'subject': (Subject, Subject.name, func.coalesce(Subject.description, '')),
+        'chapter': (Chapter, Chapter.name, func.coalesce(Chapter.description, '')),
+        'question': (Question, Question.question_title, Question.question_statement + ' ' + options),
+    }
+    selects = []
+    for kind, (model, title, body) in sources.items():
+        if kinds and kind not in kinds:
+            continue
+        conditions = [or_(title.ilike(f'%{term}%'), body.ilike(f'%{term}%')) for term in terms]
+        selects.append(
+            select(literal(kind).label('kind'), model.id.label('ref_id'), title.label('title'), body.label('snippet'))
+            .where(*conditions)
+        )
+    if not selects:
+        return []
+    query = union_all(*selects).subquery()
+    rows = db.session.execute(
+        select(query).order_by(query.c.kind, query.c.ref_id).limit(limit).offset(offset)
+    ).all()
+    return [(kind, ref_id, title, snippet[:200]) for kind, ref_id, title, snippet in rows]
+
+
+def _hits(rows):
+    # Where each hit lives, for linking: chapters belong to a subject and
+    # questions to a quiz. Two primary-key lookups for the whole page.
+    chapter_ids = [ref_id for kind, ref_id, _, _ in rows if kind == 'chapter']
+    question_ids = [ref_id for kind, ref_id, _, _ in rows if kind == 'question']
+    subjects = dict(db.session.query(Chapter.id, Chapter.subject_id).filter(Chapter.id.in_(chapter_ids)).all()) \
+        if chapter_ids else {}
+    quizzes = dict(db.session.query(Question.id, Question.quiz_id).filter(Question.id.in_(question_ids)).all()) \
+        if question_ids else {}
+    hits = []
+    for kind, ref_id, title, snippet in rows:
+        hits.append(SearchHit(
+            kind, ref_id, title, highlight(snippet),
+            ref_id if kind == 'subject' else subjects.get(ref_id),
+            quizzes.get(ref_id) if kind == 'question' else None,
+        ))
+    return hits
@@ -0,0 +1,266 @@
+import secrets
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from functools import partial, wraps
+
+from flask import current_app, flash, g, jsonify, redirect, session, url_for
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from sqlalchemy import delete, insert, select
+from werkzeug.datastructures import CallbackDict
+from werkzeug.local import LocalProxy
+
+from model import db, User, UserSession
+
+
+serializer = TaggedJSONSerializer()
+
+
+def new_sid():
+    return secrets.token_urlsafe(32)
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid or new_sid()
+        self.new = new
+        self.modified = False
+        self.stale_sids = []
+
+    def rotate(self):
+        # A fresh id on every login/logout, so a planted or leaked id is useless.
+        if not self.new:
+            self.stale_sids.append(self.sid)
+        self.sid = new_sid()
+        self.new = True
+        self.modified = True
+
+
+class MemoryBackend:
+    """Per-process LRU; only correct when a single worker serves every request."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_user = defaultdict(set)
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            if entry[2] <= datetime.utcnow():
+                self._discard(sid)
+                return None
+            self._entries.move_to_end(sid)
+            return entry[0]
+
+    def save(self, sid, data, user_id, expires_at):
+        with self._lock:
+            self._discard(sid)
+            self._entries[sid] = (data, user_id, expires_at)
+            if user_id is not None:
+                self._by_user[user_id].add(sid)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def delete(self, sid):
+        with self._lock:
+            self._discard(sid)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            sids = list(self._by_user.get(user_id, ()))
+            for sid in sids:
+                self._discard(sid)
+        return len(sids)
+
+    def purge_expired(self):
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [sid for sid, entry in self._entries.items() if entry[2] <= now]
+            for sid in expired:
+                self._discard(sid)
+        return len(expired)
+
+    def _discard(self, sid):
+        entry = self._entries.pop(sid, None)
+        if entry is None or entry[1] is None:
+            return
+        sids = self._by_user[entry[1]]
+        sids.discard(sid)
+        if not sids:
+            del self._by_user[entry[1]]
+
+
+class DatabaseBackend:
+    """Sessions in the user_session table, shared by every worker."""
+
+    def get(self, sid):
+        row = db.session.execute(
+            select(UserSession.data, UserSession.expires_at).where(UserSession.id == sid)
+        ).first()
+        if row is None or row.expires_at <= datetime.utcnow():
+            return None
+        return row.data
+
+    def save(self, sid, data, user_id, expires_at):
+        # Own transaction, so saving the session never commits (or waits on)
+        # whatever the view left in db.session.
+        with db.engine.begin() as conn:
+            conn.execute(delete(UserSession).where(UserSession.id == sid))
+            conn.execute(insert(UserSession).values(id=sid, user_id=user_id, data=data, expires_at=expires_at))
+
+    def delete(self, sid):
+        with db.engine.begin() as conn:
+            conn.execute(delete(UserSession).where(UserSession.id == sid))
+
+    def delete_user(self, user_id):
+        with db.engine.begin() as conn:
+            return conn.execute(delete(UserSession).where(UserSession.user_id == user_id)).rowcount
+
+    def purge_expired(self):
+        with db.engine.begin() as conn:
+            return conn.execute(delete(UserSession).where(UserSession.expires_at <= datetime.utcnow())).rowcount
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'database': DatabaseBackend,
+}
+
+
+class ServerSessionInterface(SessionInterface):
+    """Keeps session data server-side; the cookie only carries a signed session id."""
+
+    salt = 'quiz-master-session'
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            data = self.backend.get(sid) if sid else None
+            if data is not None:
+                return ServerSession(serializer.loads(data), sid=sid)
+        return ServerSession(new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        for sid in session.stale_sids:
+            self.backend.delete(sid)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.modified:
+                if not session.new:
+                    self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified:
+            return
+
+        self.backend.save(
+            session.sid, serializer.dumps(dict(session)), session.get('user_id'),
+            datetime.utcnow() + app.permanent_session_lifetime,
+        )
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def _load_user():
+    # One primary-key lookup per request, so is_admin changes and deleted
+    # accounts take effect on the very next request.
+    if '_current_user' not in g:
+        user_id = session.get('user_id')
+        g._current_user = db.session.get(User, user_id) if user_id is not None else None
+    return g._current_user
+
+
+current_user = LocalProxy(_load_user)
+
+
+def login_user(user):
+    session.clear()
+    session.rotate()
+    session['user_id'] = user.id
+    g._current_user = user
+
+
+def logout_user():
+    session.clear()
+    session.rotate()
+    g._current_user = None
+
+
+def revoke_user_sessions(user_id):
+    return current_app.session_interface.backend.delete_user(user_id)
+
+
+def login_required(view=None, *, api=False):
+    if view is None:
+        return partial(login_required, api=api)
+
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not current_user:
+            if api:
+                return jsonify({'error': 'Unauthorized'}), 401
+            flash('Please log in to continue.', 'danger')
+            return redirect(url_for('main.login'))
+        return view(*args, **kwargs)
+
+    return wrapped
+
+
+def admin_required(view=None, *, api=False):
+    if view is None:
+        return partial(admin_required, api=api)
+
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not current_user or not current_user.is_admin:
+            if api:
+                return jsonify({'error': 'Unauthorized'}), 401
+            flash('Access denied! Admins only.', 'danger')
+            return redirect(url_for('main.login'))
+        return view(*args, **kwargs)
+
+    return wrapped
+
+
+def init_app(app):
+    backend = app.config.get('SESSION_BACKEND', 'database')
+    if backend == 'memory':
+        backend = MemoryBackend(app.config.get('SESSION_MEMORY_SIZE', 10000))
+    else:
+        backend = BACKENDS[backend]()
+    app.session_interface = ServerSessionInterface(backend)
+    app.context_processor(lambda: {'current_user': current_user})
@@ -0,0 +1,131 @@
+from collections import Counter
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from model import db, Chapter, Quiz, Question, Score, UserSubjectMonthStat, QuizStat
+
+
+def month_of(timestamp):
+    return timestamp.strftime('%Y-%m')
+
+
+def day_of(timestamp):
+    return timestamp.strftime('%Y-%m-%d')
+
+
+def month_expr(column):
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+def day_expr(column):
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM-DD')
+    return func.strftime('%Y-%m-%d', column)
+
+
+def upsert_increments(model, rows, key_columns, counter_columns):
+    """Add each row's counter values onto the existing row, inserting it if missing."""
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = dialect_insert(model)
+        table = model.__table__
+        statement = statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: table.c[column] + statement.excluded[column] for column in counter_columns},
+        )
+        db.session.execute(statement, rows)
+        return
+
+    for row in rows:
+        key = {column: row[column] for column in key_columns}
+        existing = db.session.get(model, key)
+        if existing is None:
+            db.session.add(model(**row))
+        else:
+            for column in counter_columns:
+                setattr(existing, column, getattr(existing, column) + row[column])
+
+
+def quiz_lineage(quiz_ids):
+    rows = (
+        db.session.query(Quiz.id, Quiz.chapter_id, Chapter.subject_id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .filter(Quiz.id.in_(set(quiz_ids)))
+        .all()
+    )
+    return {quiz_id: (chapter_id, subject_id) for quiz_id, chapter_id, subject_id in rows}
+
+
+def record_scores(rows, lineage):
+    counts = Counter()
+    for row in rows:
+        if row['quiz_id'] in lineage:
+            _, subject_id = lineage[row['quiz_id']]
+            counts[(row['user_id'], subject_id, month_of(row['time_stamp_of_attempt']))] += 1
+    upsert_increments(
+        UserSubjectMonthStat,
+        [
+            {'user_id': user_id, 'subject_id': subject_id, 'month': month, 'attempts': attempts}
+            for (user_id, subject_id, month), attempts in counts.items()
+        ],
+        ['user_id', 'subject_id', 'month'],
+        ['attempts'],
+    )
+
+
+def forget_scores(*criteria):
+    """Take the Score rows matching criteria back out of the rollups before they are deleted."""
+    month = month_expr(Score.time_stamp_of_attempt)
+    grouped = (
+        db.session.query(Score.user_id, Chapter.subject_id, month.label('month'), func.count(Score.id))
+        .join(Quiz, Score.quiz_id == Quiz.id)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .filter(*criteria)
+        .group_by(Score.user_id, Chapter.subject_id, month)
+        .all()
+    )
+    upsert_increments(
+        UserSubjectMonthStat,
+        [
+            {'user_id': user_id, 'subject_id': subject_id, 'month': month, 'attempts': -attempts}
+            for user_id, subject_id, month, attempts in grouped
+        ],
+        ['user_id', 'subject_id', 'month'],
+        ['attempts'],
+    )
+    db.session.execute(delete(UserSubjectMonthStat).where(UserSubjectMonthStat.attempts <= 0))
+
+
+def adjust_question_count(quiz_id, delta):
+    upsert_increments(QuizStat, [{'quiz_id': quiz_id, 'question_count': delta}], ['quiz_id'], ['question_count'])
+
+
+def rebuild():
+    db.session.execute(delete(UserSubjectMonthStat))
+    db.session.execute(delete(QuizStat))
+
+    month = month_expr(Score.time_stamp_of_attempt)
+    db.session.execute(
+        insert(UserSubjectMonthStat).from_select(
+            ['user_id', 'subject_id', 'month', 'attempts'],
+            select(Score.user_id, Chapter.subject_id, month, func.count(Score.id))
+            .join(Quiz, Score.quiz_id == Quiz.id)
+            .join(Chapter, Quiz.chapter_id == Chapter.id)
+            .group_by(Score.user_id, Chapter.subject_id, month)
+        )
+    )
+    db.session.execute(
+        insert(QuizStat).from_select(
+            ['quiz_id', 'question_count'],
+            select(Quiz.id, func.count(Question.id))
+            .outerjoin(Question, Question.quiz_id == Quiz.id)
+            .group_by(Quiz.id)
+        )
+    )
+    db.session.commit()
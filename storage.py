@@ -0,0 +1,73 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+SQLITE_PROFILES = {
+    # SQLite's own defaults: rollback journal, full fsync, no busy wait.
+    'default': {},
+    # Readers no longer block the writer (and vice versa), commits fsync only at
+    # checkpoints, and a locked database is waited on instead of failing at once.
+    # Foreign keys are enforced so ON DELETE CASCADE applies.
+    'production': {
+        'foreign_keys': 'ON',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def database_url(url):
+    # Hosted PostgreSQL providers still hand out the legacy postgres:// scheme.
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def sqlite_pragmas(profile, overrides=None):
+    pragmas = dict(SQLITE_PROFILES[profile])
+    pragmas.update(overrides or {})
+    return pragmas
+
+
+def engine_options(url, config):
+    url = make_url(url)
+    options = {'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)}
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return options
+    options.update({
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+    })
+    return options
+
+
+def install_pragmas(engine, pragmas):
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def configure(app):
+    url = database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    options = engine_options(url, app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def init_app(app, db):
+    pragmas = sqlite_pragmas(app.config.get('STORAGE_PROFILE', 'production'), app.config.get('SQLITE_PRAGMAS'))
+    with app.app_context():
+        install_pragmas(db.engine, pragmas)
@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+from flask import g, request_started
+
+from app import create_app
+from model import db, User, Subject, Chapter, Quiz, Question
+from quiz_cache import quiz_cache
+from catalog import catalog
+from leaderboard import leaderboard
+
+
+def _forget_user(sender, **extra):
+    # Test requests share the fixture's app context, and with it g.
+    g.pop('_current_user', None)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'SCORE_WRITER_ASYNC': False,
+        'SCORE_ARCHIVE_DIR': str(tmp_path / 'score_archive'),
+        'CATALOG_CHECK_INTERVAL': 0,
+        'LEADERBOARD_SYNC_INTERVAL': 0,
+    })
+    # The caches are per process, so one test's rows must not leak into the next.
+    quiz_cache.clear()
+    catalog.clear()
+    leaderboard.clear()
+    request_started.connect(_forget_user, app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def add_user(email, is_admin=False):
+    user = User(email=email, password='x', is_admin=is_admin, fullname=email.split('@')[0],
+                dob=date(2000, 1, 1), qualification='-')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def add_quiz(subject_name='Subject', chapters=1, quizzes=1, questions=2):
+    subject = Subject(name=subject_name)
+    db.session.add(subject)
+    for c in range(chapters):
+        chapter = Chapter(subject=subject, name=f'{subject_name} chapter {c}')
+        for _ in range(quizzes):
+            quiz = Quiz(chapter=chapter, date_of_quiz=date(2026, 1, 1), time_duration='00:10')
+            for q in range(questions):
+                question = Question(quiz=quiz, question_title=f'Q{q}', question_statement='?', correct_mask=1)
+                question.set_options(['yes', 'no'])
+                db.session.add(question)
+    db.session.commit()
+    return subject
+
+
+def client_for(app, user):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+    return client
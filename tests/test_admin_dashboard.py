@@ -0,0 +1,41 @@
+from sqlalchemy import event
+
+from model import db
+from conftest import add_user, add_quiz, client_for
+
+
+def count_queries(client, path):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_dashboard_query_count_does_not_grow_with_catalog(app):
+    admin = add_user('admin@example.com', is_admin=True)
+    client = client_for(app, admin)
+    add_quiz('First')
+    one_subject = count_queries(client, '/admin_dashboard')
+
+    for i in range(10):
+        add_quiz(f'Subject {i}', chapters=3, quizzes=2, questions=3)
+    many_subjects = count_queries(client, '/admin_dashboard')
+
+    assert many_subjects == one_subject
+
+
+def test_dashboard_lists_question_counts(app):
+    admin = add_user('admin@example.com', is_admin=True)
+    add_quiz('Algebra', chapters=2, quizzes=2, questions=3)
+    page = ' '.join(client_for(app, admin).get('/admin_dashboard').get_data(as_text=True).split())
+    # Two quizzes of three questions each per chapter.
+    assert 'Algebra chapter 0</td> <td>6</td>' in page
+    assert 'Algebra chapter 1</td> <td>6</td>' in page
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from model import db, Quiz, Score, DeletedScore
+from conftest import add_quiz, add_user, client_for
+
+
+def test_deleting_a_quiz_whose_score_id_was_archived_before(app):
+    add_quiz(quizzes=2)
+    first, second = [quiz_id for quiz_id, in db.session.query(Quiz.id).order_by(Quiz.id)]
+    admin = client_for(app, add_user('admin@example.com', is_admin=True))
+    student = add_user('student@example.com')
+    client_for(app, student).post('/submit_quiz', json={'quiz_id': second, 'answers': {}})
+    score_id = db.session.query(Score.id).scalar()
+
+    # Before score ids stopped being reused, an earlier attempt could have been
+    # archived under the very id this one has.
+    db.session.add(DeletedScore(original_score_id=score_id, quiz_id=first, user_id=student.id,
+                                time_stamp_of_attempt=datetime(2026, 1, 1), total_scored=0,
+                                deleted_at=datetime(2026, 1, 2)))
+    db.session.commit()
+    assert admin.post(f'/quiz/delete/{second}').status_code == 302
+
+    archived = db.session.query(DeletedScore.original_score_id, DeletedScore.quiz_id).order_by(DeletedScore.id).all()
+    assert archived == [(score_id, first), (score_id, second)]
+    assert db.session.query(Score).count() == 0
@@ -0,0 +1,38 @@
+from grading import AnswerKey
+from quiz_cache import CachedQuestion
+
+
+def test_single_and_batch_grading_agree():
+    # Question 30 is multi-select (options 1 and 3); question 20 has no correct option.
+    key = AnswerKey([30, 10, 20], [0b101, 0b010, 0])
+    submissions = [
+        {'10': 2, '30': [1, 3]},
+        {'10': 1, '30': [1]},
+        {'10': 2, '20': 1, '30': [1, 2, 3]},
+        {},
+    ]
+    vectors = [key.encode(answers) for answers in submissions]
+
+    assert key.max_score == 2
+    assert [key.grade(vector).total for vector in vectors] == [2, 0, 1, 0]
+    assert key.grade_packed([key.pack(vector) for vector in vectors]).totals.tolist() == [2, 0, 1, 0]
+
+
+def test_weighted_key_gives_partial_credit():
+    # Weights follow the given question order, not id order.
+    key = AnswerKey([30, 10, 20], [0b101, 0b010, 0b001], weights=[0.5, 1.25, 2])
+    vectors = [key.encode({'10': 2, '30': [1, 3]}), key.encode({'20': 1, '30': [1, 3]}), key.encode({'10': 1})]
+
+    assert key.max_score == 3.75
+    result = key.grade(vectors[0])
+    assert result.total == 1.75
+    assert result.earned.tolist() == [1.25, 0.0, 0.5]
+    batch = key.grade_batch(vectors)
+    assert batch.totals.tolist() == [1.75, 2.5, 0.0]
+    assert batch.earned[1].tolist() == [0.0, 2.0, 0.5]
+
+
+def test_from_questions_takes_weights_in_question_order():
+    questions = [CachedQuestion(7, 'A', '?', ('x', 'y'), 0b01), CachedQuestion(3, 'B', '?', ('x', 'y'), 0b10)]
+    key = AnswerKey.from_questions(questions, weights=[0.5, 1])
+    assert key.grade({'7': 1, '3': 2}).earned.tolist() == [1.0, 0.5]
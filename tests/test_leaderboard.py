@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime
+
+from catalog import catalog
+from conftest import add_quiz, add_user, client_for
+from leaderboard import leaderboard
+from model import db, Chapter, Quiz, Score, Subject
+from score_archive import score_archive
+
+
+def submit(client, quiz_id, correct):
+    answers = {}
+    if correct:
+        answers = {question.id: 1 for question in db.session.get(Quiz, quiz_id).questions}
+    assert client.post('/submit_quiz', json={'quiz_id': quiz_id, 'answers': answers}).status_code == 200
+
+
+def test_catalog_edits_keep_unaffected_boards(app):
+    add_quiz('Algebra', quizzes=2)
+    add_quiz('Biology')
+    first, second, other = [quiz_id for quiz_id, in db.session.query(Quiz.id).order_by(Quiz.id)]
+    algebra = db.session.query(Subject.id).filter_by(name='Algebra').scalar()
+    student = add_user('student@example.com')
+    submit(client_for(app, student), first, correct=True)
+
+    assert leaderboard.standing('quiz', other, student.id) == (None, None, 0)
+    assert leaderboard.standing('subject', algebra, student.id) == (1, 2, 1)
+    loads = leaderboard.loads
+
+    db.session.add(Subject(name='Chemistry'))
+    catalog.bump()
+    db.session.commit()
+    assert leaderboard.standing('subject', algebra, student.id) == (1, 2, 1)
+    assert leaderboard.loads == loads
+
+    # Moving a quiz into Algebra rebuilds Algebra's board with it.
+    db.session.get(Quiz, other).chapter_id = db.session.query(Chapter.id).filter_by(subject_id=algebra).scalar()
+    catalog.bump()
+    db.session.commit()
+    submit(client_for(app, student), other, correct=True)
+    submit(client_for(app, student), second, correct=False)
+    assert leaderboard.standing('subject', algebra, student.id) == (1, 4, 1)
+
+
+def test_deleting_a_quiz_rebuilds_the_boards(app):
+    add_quiz('Algebra', quizzes=2)
+    first, second = [quiz_id for quiz_id, in db.session.query(Quiz.id).order_by(Quiz.id)]
+    algebra = db.session.query(Subject.id).scalar()
+    student = add_user('student@example.com')
+    admin = client_for(app, add_user('admin@example.com', is_admin=True))
+    submit(client_for(app, student), first, correct=True)
+    submit(client_for(app, student), second, correct=True)
+    assert leaderboard.standing('subject', algebra, student.id) == (1, 4, 1)
+
+    assert admin.post(f'/quiz/delete/{first}').status_code == 302
+    assert leaderboard.standing('subject', algebra, student.id) == (1, 2, 1)
+
+
+def test_sync_picks_up_attempts_committed_out_of_id_order(app):
+    add_quiz()
+    quiz_id = db.session.query(Quiz.id).scalar()
+    first, second, late = [add_user(f'student{i}@example.com') for i in range(3)]
+    db.session.add(Score(id=10, quiz_id=quiz_id, user_id=first.id, total_scored=1,
+                         time_stamp_of_attempt=datetime(2026, 1, 1)))
+    db.session.commit()
+    assert leaderboard.standing('quiz', quiz_id, first.id) == (1, 1, 1)
+
+    db.session.add(Score(id=12, quiz_id=quiz_id, user_id=second.id, total_scored=1,
+                         time_stamp_of_attempt=datetime(2026, 1, 2)))
+    db.session.commit()
+    assert leaderboard.standing('quiz', quiz_id, second.id) == (2, 1, 2)
+
+    # Id 11 was handed out before 12 but its transaction committed after the sync.
+    db.session.add(Score(id=11, quiz_id=quiz_id, user_id=late.id, total_scored=2,
+                         time_stamp_of_attempt=datetime(2026, 1, 3)))
+    db.session.commit()
+    assert leaderboard.standing('quiz', quiz_id, late.id) == (1, 2, 3)
+
+
+def test_a_cold_board_load_does_not_hold_up_loaded_boards(app, monkeypatch):
+    add_quiz(quizzes=2)
+    loaded, cold = [quiz_id for quiz_id, in db.session.query(Quiz.id).order_by(Quiz.id)]
+    student = add_user('student@example.com')
+    leaderboard.top('quiz', loaded)
+
+    started, release = threading.Event(), threading.Event()
+    quiz_results = score_archive.quiz_results
+
+    def slow_quiz_results(quiz_id):
+        started.set()
+        release.wait(5)
+        return quiz_results(quiz_id)
+
+    monkeypatch.setattr(score_archive, 'quiz_results', slow_quiz_results)
+
+    def load():
+        with app.app_context():
+            leaderboard.top('quiz', cold)
+
+    loader = threading.Thread(target=load)
+    loader.start()
+    try:
+        assert started.wait(5)
+        standing = leaderboard.record(loaded, student.id, 2, datetime(2026, 1, 1))
+        assert standing['rank'] == 1
+        assert loader.is_alive()
+    finally:
+        release.set()
+        loader.join(5)
+    assert leaderboard.stats()['quizzes'] == 2
@@ -0,0 +1,25 @@
+from catalog import catalog
+from model import db, Quiz, Question
+from quiz_cache import quiz_cache
+from conftest import add_quiz
+
+
+def test_edit_through_another_worker_reaches_the_answer_key(app):
+    add_quiz('Physics', questions=1)
+    quiz = Quiz.query.one()
+    assert quiz_cache.get(quiz.id).answer_key.correct.tolist() == [1]
+
+    # Another worker edits the key: its own cache is cleared, this one only
+    # sees the catalog generation move.
+    Question.query.one().correct_mask = 2
+    catalog.bump()
+    db.session.commit()
+
+    assert quiz_cache.get(quiz.id).answer_key.correct.tolist() == [2]
+
+
+def test_snapshots_are_reused_until_the_generation_moves(app):
+    add_quiz('Physics')
+    quiz = Quiz.query.one()
+    first = quiz_cache.get(quiz.id)
+    assert quiz_cache.get(quiz.id) is first
@@ -0,0 +1,118 @@
+import html
+import re
+from datetime import datetime, timedelta
+
+import analytics
+import bulk_io
+import stats
+from conftest import add_quiz, add_user, client_for
+from leaderboard import leaderboard
+from model import db, Quiz, Subject, Score, UserSubjectMonthStat, ChapterScoreHistogram, SubjectDayStat
+from score_archive import score_archive
+from score_writer import score_writer
+
+
+def score_pages(client):
+    pages, url = [], '/scores'
+    while url:
+        page = client.get(url).get_data(as_text=True)
+        pages.append(page)
+        older = re.search(r'href="(/scores\?[^"]+)"', page)
+        url = html.unescape(older.group(1)) if older else None
+    return pages
+
+
+def boards():
+    leaderboard.clear()
+    quizzes = [quiz_id for quiz_id, in db.session.query(Quiz.id)]
+    subjects = [subject_id for subject_id, in db.session.query(Subject.id)]
+    return (
+        [leaderboard.top('quiz', quiz_id, 100) for quiz_id in quizzes],
+        [leaderboard.top('subject', subject_id, 100) for subject_id in subjects],
+    )
+
+
+def rollups():
+    return [
+        sorted(tuple(row) for row in db.session.query(*columns))
+        for columns in (
+            (UserSubjectMonthStat.user_id, UserSubjectMonthStat.subject_id, UserSubjectMonthStat.month,
+             UserSubjectMonthStat.attempts),
+            (ChapterScoreHistogram.chapter_id, ChapterScoreHistogram.total_scored, ChapterScoreHistogram.attempts),
+            (SubjectDayStat.subject_id, SubjectDayStat.day, SubjectDayStat.attempts),
+        )
+    ]
+
+
+def attempts(students, quizzes):
+    # Three months of attempts in pairs sharing a student and a timestamp, so
+    # the pages split across the archive boundary and keyset ties matter.
+    start = datetime(2026, 1, 3, 9, 30)
+    for i in range(60):
+        student = students[i // 2 % len(students)]
+        quiz_id = quizzes[i % len(quizzes)]
+        when = start + timedelta(days=i // 2 * 3, minutes=i // 4 * 7)
+        score_writer.submit(quiz_id, student.id, i % 4, time_stamp_of_attempt=when)
+
+
+def test_archived_months_read_back_like_score(app):
+    app.config['SCORE_PAGE_SIZE'] = 4
+    add_quiz('Algebra', chapters=2, questions=3)
+    add_quiz('Biology', quizzes=2, questions=3)
+    students = [add_user(f'student{i}@example.com') for i in range(3)]
+    attempts(students, [quiz_id for quiz_id, in db.session.query(Quiz.id).order_by(Quiz.id)])
+    clients = [client_for(app, student) for student in students]
+
+    pages = [score_pages(client) for client in clients]
+    standings = boards()
+    counts = rollups()
+
+    results = score_archive.archive(datetime(2026, 3, 1), verify=True)
+    assert [result.month for result in results] == ['2026-01', '2026-02']
+    assert db.session.query(Score).count() < 60
+
+    assert [score_pages(client) for client in clients] == pages
+    assert boards() == standings
+    assert rollups() == counts
+
+    stats.rebuild()
+    analytics.rebuild()
+    score_archive.add_to_rollups()
+    db.session.commit()
+    assert rollups() == counts
+
+
+def test_archiving_does_not_free_ids(app):
+    add_quiz(questions=1)
+    quiz_id = db.session.query(Quiz.id).scalar()
+    student = add_user('student@example.com')
+    score_writer.submit(quiz_id, student.id, 1, time_stamp_of_attempt=datetime(2026, 1, 5))
+    score_archive.archive(datetime(2026, 2, 1))
+
+    score_writer.submit(quiz_id, student.id, 0, time_stamp_of_attempt=datetime(2026, 2, 5))
+    assert db.session.query(Score.id).scalar() == 2
+    page = client_for(app, student).get('/scores').get_data(as_text=True)
+    assert '05-01-2026' in page and '05-02-2026' in page
+
+
+def exports(admin, quiz_id):
+    csv_lines = ''.join(bulk_io.export_lines('scores', 'csv', chunk_size=7)).splitlines()
+    return (
+        csv_lines[0], sorted(csv_lines[1:]),
+        sorted(admin.get('/admin/export/scores.jsonl').get_data(as_text=True).splitlines()),
+        sorted(''.join(bulk_io.export_lines('scores', 'jsonl', quiz_id=quiz_id)).splitlines()),
+    )
+
+
+def test_score_exports_include_archived_months(app):
+    add_quiz('Algebra', chapters=2, questions=3)
+    quiz_ids = [quiz_id for quiz_id, in db.session.query(Quiz.id).order_by(Quiz.id)]
+    students = [add_user(f'student{i}@example.com') for i in range(3)]
+    attempts(students, quiz_ids)
+    admin = client_for(app, add_user('admin@example.com', is_admin=True))
+
+    before = exports(admin, quiz_ids[0])
+    assert len(before[1]) == 60
+    score_archive.archive(datetime(2026, 3, 1))
+    assert db.session.query(Score).count() < 60
+    assert exports(admin, quiz_ids[0]) == before
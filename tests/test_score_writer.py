@@ -0,0 +1,69 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import add_quiz, add_user, client_for
+from model import db, Quiz, Score
+from score_writer import score_writer
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(score_writer, 'spool_path', str(tmp_path / 'score_spool.jsonl'))
+    monkeypatch.setattr(score_writer, 'dead_letter_path', str(tmp_path / 'score_dead_letter.jsonl'))
+    return tmp_path
+
+
+def row(quiz_id, user_id, total_scored=1):
+    return {'quiz_id': quiz_id, 'user_id': user_id, 'time_stamp_of_attempt': datetime(2026, 1, 1),
+            'total_scored': total_scored, 'answers': None}
+
+
+def test_submit_to_unknown_quiz_is_404(app, files):
+    student = add_user('student@example.com')
+    response = client_for(app, student).post('/submit_quiz', json={'quiz_id': 999, 'answers': {}})
+    assert response.status_code == 404
+    assert db.session.query(Score).count() == 0
+
+
+def test_rejected_rows_are_dead_lettered_not_spooled(app, files):
+    add_quiz()
+    quiz_id = db.session.query(Quiz.id).scalar()
+    student = add_user('student@example.com')
+
+    score_writer._flush([row(quiz_id, student.id, 1), row(999, student.id), row(quiz_id, student.id, 2)])
+
+    assert sorted(score for score, in db.session.query(Score.total_scored)) == [1, 2]
+    assert not (files / 'score_spool.jsonl').exists()
+    dead = [json.loads(line) for line in (files / 'score_dead_letter.jsonl').read_text().splitlines()]
+    assert [record['quiz_id'] for record in dead] == [999]
+
+
+def test_replay_sets_rejected_rows_aside(app, files):
+    add_quiz()
+    quiz_id = db.session.query(Quiz.id).scalar()
+    student = add_user('student@example.com')
+    score_writer._spool([row(999, student.id), row(quiz_id, student.id)])
+
+    assert score_writer.replay_spool() == 2
+    assert score_writer.replay_spool() == 0
+    assert db.session.query(Score).count() == 1
+    assert len((files / 'score_dead_letter.jsonl').read_text().splitlines()) == 1
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'json': {'answers': {}}},
+    {'json': {'quiz_id': 'abc', 'answers': {}}},
+    {'json': {'quiz_id': 1, 'answers': [1, 2]}},
+    {'json': [1]},
+    {'data': 'not json', 'content_type': 'text/plain'},
+    {},
+])
+def test_malformed_submissions_are_400(app, files, kwargs):
+    add_quiz()
+    student = add_user('student@example.com')
+    response = client_for(app, student).post('/submit_quiz', **kwargs)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert db.session.query(Score).count() == 0
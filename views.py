@@ -0,0 +1,727 @@
+from flask import (
+    Blueprint, current_app, render_template, stream_template, stream_with_context, request, redirect, url_for,
+    flash, jsonify, make_response
+)
+import io
+from datetime import datetime
+from collections import namedtuple
+from itertools import groupby
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import func, or_, and_
+from model import (
+    db, Subject, Chapter, Quiz, Question, Score, User, UserSubjectMonthStat, QuizStat
+)
+import stats
+import analytics
+import instrumentation
+import bulk_io
+import deletion
+import search as search_index
+from quiz_cache import quiz_cache
+from catalog import catalog
+from leaderboard import leaderboard
+from score_archive import score_archive
+from score_writer import score_writer
+from grading import MAX_OPTIONS, compact_options
+from credentials import credentials
+from sessions import current_user, login_required, admin_required, login_user, logout_user
+
+bp = Blueprint('main', __name__)
+
+@bp.route('/')
+def home():
+    return render_template('home.html')
+        
+@bp.route('/log')
+def log():
+    return render_template('login.html')
+
+@bp.route('/reg')
+def reg():
+    return render_template('register.html')
+
+@bp.route('/user_dashboard')
+@login_required
+def user_dashboard():
+    return render_template('userdashboard.html', quizzes=catalog.get().quizzes)
+
+@bp.route('/admin_dashboard')
+@admin_required
+def admin_dashboard():
+    # One round trip for the whole tree: subjects -> chapters -> quizzes -> questions,
+    # with the question count aggregated per chapter in SQL.
+    rows = (
+        db.session.query(
+            Subject.id.label('subject_id'),
+            Subject.name.label('subject_name'),
+            Chapter.id.label('chapter_id'),
+            Chapter.name.label('chapter_name'),
+            Chapter.description.label('chapter_description'),
+            func.count(Question.id).label('question_count')
+        )
+        .outerjoin(Chapter, Chapter.subject_id == Subject.id)
+        .outerjoin(Quiz, Quiz.chapter_id == Chapter.id)
+        .outerjoin(Question, Question.quiz_id == Quiz.id)
+        .group_by(Subject.id, Subject.name, Chapter.id, Chapter.name, Chapter.description)
+        .order_by(Subject.id, Chapter.id)
+        .all()
+    )
+
+    subjects_with_chapters = []
+    for row in rows:
+        if not subjects_with_chapters or subjects_with_chapters[-1]['id'] != row.subject_id:
+            subjects_with_chapters.append({
+                'id': row.subject_id,
+                'name': row.subject_name,
+                'chapters': []
+            })
+        if row.chapter_id is not None:
+            subjects_with_chapters[-1]['chapters'].append({
+                'id': row.chapter_id,
+                'name': row.chapter_name,
+                'description': row.chapter_description or '',
+                'question_count': row.question_count
+            })
+
+    return render_template('admin.html', subjects=subjects_with_chapters)
+
+
+@bp.route('/new_sub')
+@admin_required
+def new_sub():
+    return render_template('newsubject.html')
+
+@bp.route('/new_chap/<int:sub_id>')
+@admin_required
+def new_chap(sub_id):
+    return render_template('newchapter.html', sub_id=sub_id)
+
+@bp.route('/new_quiz')
+@admin_required
+def new_quiz():
+    return render_template("newquiz.html", subjects=catalog.get().subjects)
+
+@bp.route("/get_chapters/<int:subject_id>")
+@admin_required
+def get_chapters(subject_id):
+    chapters = catalog.get().chapters_by_subject.get(subject_id, ())
+    chapter_list = [{"id": c.id, "name": c.name} for c in chapters]
+    return jsonify(chapter_list)
+
+@bp.route('/new_ques')
+@admin_required
+def new_ques():
+    return render_template('newquestion.html')
+
+QuizEntry = namedtuple('QuizEntry', 'id chapter_name question_count questions')
+
+@bp.route('/quiz_manage')
+@admin_required
+def quiz_management():
+    page_size = current_app.config['QUIZ_PAGE_SIZE']
+    after = request.args.get('after', 0, type=int)
+
+    
+    quizzes = (
+        db.session.query(
+            Quiz.id,
+            Chapter.name.label('chapter_name'),
+            func.coalesce(QuizStat.question_count, 0).label('question_count')
+        )
+        .outerjoin(Chapter, Quiz.chapter_id == Chapter.id)
+        .outerjoin(QuizStat, QuizStat.quiz_id == Quiz.id)
+        .filter(Quiz.id > after)
+        .order_by(Quiz.id)
+        .limit(page_size + 1)
+        .all()
+    )
+    next_after = quizzes[page_size - 1].id if len(quizzes) > page_size else None
+    quizzes = quizzes[:page_size]
+
+    def entries():
+        # Questions for this page only, streamed in quiz order and grouped as they arrive.
+        questions = (
+            Question.query
+            .options(selectinload(Question.options))
+            .filter(Question.quiz_id.in_([quiz.id for quiz in quizzes]))
+            .order_by(Question.quiz_id, Question.id)
+            .yield_per(200)
+        )
+        grouped = groupby(questions, key=lambda question: question.quiz_id)
+        pending = next(grouped, None)
+        for quiz in quizzes:
+            quiz_questions = []
+            if pending is not None and pending[0] == quiz.id:
+                quiz_questions = list(pending[1])
+                pending = next(grouped, None)
+            yield QuizEntry(quiz.id, quiz.chapter_name, quiz.question_count, quiz_questions)
+
+    return stream_template('quizmanagement.html', quizzes=entries(), after=after, next_after=next_after)
+
+@bp.route('/admin/summary')
+@admin_required
+def admin_summary():
+    
+    summary = analytics.summary()
+
+    return render_template(
+        'admin_summary.html',
+        subjects=summary['subjects'],
+        attempts=summary['attempts'],
+        chapters=summary['chapters'],
+        top_scores=summary['top_scores']
+    )
+
+@bp.route('/api/admin/summary')
+@admin_required(api=True)
+def admin_summary_data():
+    return jsonify(analytics.summary())
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = request.form['email']
+        password = request.form['password']
+
+        
+        if credentials.rate_limited(email):
+            flash('Too many login attempts! Please wait a minute and try again.', 'danger')
+            return render_template('login.html'), 429
+
+        user = User.query.filter_by(email=email).first()
+
+        
+        if credentials.authenticate(user, email, password):
+            login_user(user)
+            flash('Login successful!', 'success')
+            if user.is_admin:
+                return redirect(url_for('main.admin_dashboard'))  
+
+            
+            return redirect(url_for('main.user_dashboard'))  
+        
+        else:
+            flash('Invalid email or password!', 'danger')
+
+    return render_template('login.html')  
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        email = request.form['email']
+        password = request.form['password']
+        fullname = request.form['fullname']
+        qualification = request.form['qualification']
+        dob = request.form['dob']
+
+        
+        existing_user = User.query.filter_by(email=email).first()
+        if existing_user:
+            flash('Email already exists! Please log in.', 'danger')
+            return redirect(url_for('main.register'))
+
+        
+        dob = datetime.strptime(dob, '%Y-%m-%d').date()
+
+        
+        hashed_password = credentials.hash(password)
+
+        
+        new_user = User(
+            email=email,
+            password=hashed_password,
+            fullname=fullname,
+            qualification=qualification,
+            dob=dob
+        )
+
+        
+        db.session.add(new_user)
+        db.session.commit()
+
+        flash('Registration successful! You can now log in.', 'success')
+        
+        return redirect(url_for('main.login'))
+
+    return render_template('register.html')
+
+@bp.route('/view_quiz/<int:quiz_id>')
+@login_required
+def view_quiz(quiz_id):
+    
+    quiz = db.session.query(
+        Quiz.id, Quiz.date_of_quiz, Quiz.time_duration,
+        Subject.name.label('subject_name'), Chapter.name.label('chapter_name'),
+        db.func.count(Question.id).label('num_questions')  
+    ).join(Chapter, Quiz.chapter_id == Chapter.id)\
+     .join(Subject, Chapter.subject_id == Subject.id)\
+     .outerjoin(Question, Quiz.id == Question.quiz_id)\
+     .filter(Quiz.id == quiz_id)\
+     .group_by(Quiz.id, Subject.name, Chapter.name)\
+     .first()
+
+    if not quiz:
+        flash('Quiz not found!', 'danger')
+        return redirect(url_for('main.user_dashboard'))
+
+    return render_template('viewquiz.html', quiz=quiz)
+
+@bp.route('/start_quiz/<int:quiz_id>')
+@login_required
+def start_quiz(quiz_id):
+    
+    quiz = db.session.query(
+        Quiz.id, Quiz.date_of_quiz, Quiz.time_duration,
+        Subject.name.label('subject_name'), Chapter.name.label('chapter_name')
+    ).join(Chapter, Quiz.chapter_id == Chapter.id)\
+     .join(Subject, Chapter.subject_id == Subject.id)\
+     .filter(Quiz.id == quiz_id)\
+     .first()
+
+    
+    snapshot = quiz_cache.get(quiz_id)
+
+    if not quiz or not snapshot.questions:
+        flash('Quiz or questions not found!', 'danger')
+        return redirect(url_for('main.user_dashboard'))
+
+    return render_template('startquiz.html', quiz=quiz, question_count=len(snapshot.questions))
+
+@bp.route('/api/quiz/<int:quiz_id>/payload')
+@login_required(api=True)
+def quiz_payload(quiz_id):
+    snapshot = quiz_cache.get(quiz_id)
+    if not snapshot.questions:
+        return jsonify({'error': 'Quiz not found'}), 404
+
+    use_gzip = current_app.config['QUIZ_PAYLOAD_GZIP'] and 'gzip' in request.accept_encodings
+    etag = snapshot.etag + '-gzip' if use_gzip else snapshot.etag
+
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(snapshot.payload_gzip if use_gzip else snapshot.payload)
+        response.mimetype = 'application/json'
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+@bp.route('/submit_quiz', methods=['POST'])
+@login_required(api=True)
+def submit_quiz():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        quiz_id = int(data.get('quiz_id'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'quiz_id must be an integer'}), 400
+    user_id = current_user.id
+    user_answers = data.get('answers', {})
+    if not isinstance(user_answers, dict):
+        return jsonify({'error': 'answers must be an object'}), 400
+
+    
+    snapshot = quiz_cache.get(quiz_id)
+    if not snapshot.questions:
+        return jsonify({'error': 'Quiz not found'}), 404
+    answer_key = snapshot.answer_key
+    answer_vector = answer_key.encode(user_answers)
+    result = answer_key.grade(answer_vector)
+    score = int(round(result.total))
+
+    
+    row = score_writer.submit(quiz_id, user_id, score, answers=answer_key.pack(answer_vector))
+    standing = leaderboard.record(quiz_id, user_id, score, row['time_stamp_of_attempt'])
+    return jsonify(dict(standing, score=score, message='Quiz submitted successfully!'))
+
+@bp.route('/api/leaderboard/<any(quiz, subject):kind>/<int:ref_id>')
+@login_required(api=True)
+def leaderboard_top(kind, ref_id):
+    limit = min(max(request.args.get('limit', 10, type=int), 1), current_app.config['LEADERBOARD_MAX_LIMIT'])
+    top = leaderboard.top(kind, ref_id, limit)
+    rank, best, participants = leaderboard.standing(kind, ref_id, current_user.id)
+    names = dict(
+        db.session.query(User.id, User.fullname).filter(User.id.in_([row.user_id for row in top])).all()
+    ) if top else {}
+    return jsonify({
+        'top': [
+            {'rank': row.rank, 'user_id': row.user_id, 'name': names.get(row.user_id), 'score': row.score,
+             'time_stamp_of_attempt': row.time_stamp_of_attempt.isoformat()}
+            for row in top
+        ],
+        'you': {'rank': rank, 'score': best},
+        'participants': participants
+    })
+
+ScoreEntry = namedtuple('ScoreEntry', 'id quiz_id total_scored time_stamp_of_attempt chapter_name total_questions')
+
+@bp.route('/scores')
+@login_required
+def view_scores():
+    user_id = current_user.id
+    page_size = current_app.config['SCORE_PAGE_SIZE']
+
+    query = db.session.query(
+        Score.id, Score.quiz_id, Score.total_scored, Score.time_stamp_of_attempt,
+        Chapter.name.label('chapter_name'),
+        db.func.coalesce(QuizStat.question_count, 0).label('total_questions')  
+    ).join(Quiz, Score.quiz_id == Quiz.id)\
+     .join(Chapter, Quiz.chapter_id == Chapter.id)\
+     .outerjoin(QuizStat, QuizStat.quiz_id == Score.quiz_id)\
+     .filter(Score.user_id == user_id)
+
+    
+    before = request.args.get('before')
+    before_id = request.args.get('before_id', type=int)
+    if before and before_id is not None:
+        try:
+            before = datetime.fromisoformat(before)
+        except ValueError:
+            return redirect(url_for('main.view_scores'))
+        query = query.filter(or_(
+            Score.time_stamp_of_attempt < before,
+            and_(Score.time_stamp_of_attempt == before, Score.id < before_id)
+        ))
+
+    scores = query.order_by(Score.time_stamp_of_attempt.desc(), Score.id.desc())\
+                  .limit(page_size + 1)\
+                  .all()
+
+    # Closed months live in the score archive; merge in the page's worth from there.
+    quizzes = catalog.get().quizzes_by_id
+    cursor = (before, before_id) if before and before_id is not None else None
+    archived = score_archive.history(user_id, quizzes, cursor, page_size + 1)
+    if archived:
+        # Only an archive run that died before committing leaves a row in both;
+        # ids from before AUTOINCREMENT may repeat, so match the whole attempt.
+        live = {(row.id, row.quiz_id, row.time_stamp_of_attempt) for row in scores}
+        scores += [
+            ScoreEntry(row.id, row.quiz_id, row.total_scored, row.time_stamp_of_attempt,
+                       quizzes[row.quiz_id].chapter_name, quizzes[row.quiz_id].num_questions)
+            for row in archived if (row.id, row.quiz_id, row.time_stamp_of_attempt) not in live
+        ]
+        scores.sort(key=lambda row: (row.time_stamp_of_attempt, row.id), reverse=True)
+        del scores[page_size + 1:]
+    next_cursor = None
+    if len(scores) > page_size:
+        last = scores[page_size - 1]
+        next_cursor = {'before': last.time_stamp_of_attempt.isoformat(), 'before_id': last.id}
+    scores = scores[:page_size]
+
+    return stream_template('score.html', scores=iter(scores), next_cursor=next_cursor,
+                           first_page=before is None, user_name=current_user.fullname)
+
+@bp.route('/summary')
+@login_required
+def quiz_summary():
+    user_id = current_user.id
+
+    
+    subject_data = db.session.query(
+        Subject.name.label('subject_name'),
+        db.func.sum(UserSubjectMonthStat.attempts).label('quiz_count')
+    ).join(UserSubjectMonthStat, Subject.id == UserSubjectMonthStat.subject_id)\
+     .filter(UserSubjectMonthStat.user_id == user_id)\
+     .group_by(Subject.id, Subject.name)\
+     .all()
+
+    
+    subjects = [row.subject_name for row in subject_data] if subject_data else []
+    subject_counts = [row.quiz_count for row in subject_data] if subject_data else []
+
+    
+    month_data = db.session.query(
+        UserSubjectMonthStat.month.label('month'),
+        db.func.sum(UserSubjectMonthStat.attempts).label('quiz_count')
+    ).filter(UserSubjectMonthStat.user_id == user_id)\
+     .group_by(UserSubjectMonthStat.month)\
+     .order_by(UserSubjectMonthStat.month)\
+     .all()
+
+    
+    months = [row.month for row in month_data] if month_data else []
+    month_counts = [row.quiz_count for row in month_data] if month_data else []
+
+    return render_template('summary.html', 
+                           subjects=subjects or [], subject_counts=subject_counts or [], 
+                           months=months or [], month_counts=month_counts or [], 
+                           user_name=current_user.fullname)
+
+@bp.route('/add_subject', methods=['POST'])
+@admin_required
+def add_subject():
+    subject_name = request.form['subject_name']
+    description = request.form['description']
+
+    new_subject = Subject(name=subject_name, description=description)
+    db.session.add(new_subject)
+    catalog.bump()
+    db.session.commit()
+
+    flash('Subject added successfully!', 'success')
+    return redirect(url_for('main.admin_dashboard'))
+
+@bp.route('/add_chapter/<int:subject_id>', methods=['GET', 'POST'])
+@admin_required
+def add_chapter(subject_id):
+    subject = Subject.query.get_or_404(subject_id)
+
+    if request.method == 'POST':
+        chapter_name = request.form['name']
+        chapter_description = request.form.get('description', '')
+
+        new_chapter = Chapter(subject_id=subject.id, name=chapter_name, description=chapter_description)
+        db.session.add(new_chapter)
+        catalog.bump()
+        db.session.commit()
+
+        flash(f'Chapter "{chapter_name}" added successfully!', 'success')
+        return redirect(url_for('main.admin_dashboard')) 
+        
+    return render_template('newchapter.html', subject=subject)
+
+@bp.route("/add_quiz", methods=["POST"])
+@admin_required
+def add_quiz():
+    try:
+        chapter_id = request.form.get("chapter_id")
+        date_of_quiz = request.form.get("date")
+        time_duration = request.form.get("duration")
+        remarks = request.form.get("remarks", "")  
+
+        
+        date_of_quiz = datetime.strptime(date_of_quiz, "%Y-%m-%d").date()
+
+        
+        new_quiz = Quiz(
+            chapter_id=chapter_id,
+            date_of_quiz=date_of_quiz,
+            time_duration=time_duration,
+            remarks=remarks
+        )
+
+        
+        db.session.add(new_quiz)
+        catalog.bump()
+        db.session.commit()
+
+        flash("Quiz added successfully!", "success")
+        return redirect(url_for("main.admin_dashboard"))
+    
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error adding quiz: {str(e)}", "danger")
+        return redirect(url_for("main.new_quiz"))
+
+@bp.route("/new_question/<int:quiz_id>")
+@admin_required
+def new_question(quiz_id):
+    quiz = Quiz.query.get_or_404(quiz_id)
+    quizzes = Quiz.query.options(joinedload(Quiz.chapter)).all()  
+
+    return render_template("newquestion.html", quiz=quiz, quizzes=quizzes, max_options=MAX_OPTIONS)
+
+def read_options(form):
+    # The question forms repeat an "option" text field per row and a "correct"
+    # checkbox whose value is that row's 1-based position.
+    correct = [int(value) for value in form.getlist('correct') if value.isdigit()]
+    options, correct_mask = compact_options(form.getlist('option'), correct)
+    if len(options) < 2:
+        raise ValueError('a question needs at least two options')
+    if len(options) > MAX_OPTIONS:
+        raise ValueError(f'a question can have at most {MAX_OPTIONS} options')
+    if not correct_mask:
+        raise ValueError('mark at least one filled-in option as correct')
+    return options, correct_mask
+
+@bp.route("/add_question", methods=["POST"])
+@admin_required
+def add_question():
+    try:
+        quiz_id = int(request.form.get("quiz_id"))  
+        question_title = request.form.get("question_title")  
+        question_statement = request.form.get("question_statement")
+        options, correct_mask = read_options(request.form)
+
+        new_question = Question(
+            quiz_id=quiz_id,
+            question_title=question_title,  
+            question_statement=question_statement,
+            correct_mask=correct_mask
+        )
+        new_question.set_options(options)
+
+        db.session.add(new_question)
+        stats.adjust_question_count(quiz_id, 1)
+        catalog.bump()
+        db.session.commit()
+        quiz_cache.invalidate(quiz_id)
+
+        flash("Question added successfully!", "success")
+        return redirect(url_for("main.new_question", quiz_id=quiz_id))  
+
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Error adding question: {str(e)}", "danger")
+        return redirect(url_for('main.quiz_management')) 
+
+
+@bp.route('/chapter/edit/<int:chapter_id>', methods=['POST'])
+@admin_required
+def edit_chapter(chapter_id):
+    chapter = Chapter.query.get_or_404(chapter_id)
+    chapter.name = request.form['chapter_name']
+    chapter.description = request.form['chapter_desc']
+    catalog.bump()
+    db.session.commit()
+    return redirect(url_for('main.admin_dashboard'))
+
+@bp.route('/chapter/delete/<int:chapter_id>', methods=['POST'])
+@admin_required
+def delete_chapter(chapter_id):
+    Chapter.query.get_or_404(chapter_id)
+    deletion.delete_chapters([chapter_id], batch_size=current_app.config['DELETE_BATCH_SIZE'])
+    return redirect(url_for('main.admin_dashboard'))
+
+@bp.route('/subject/delete/<int:subject_id>', methods=['POST'])
+@admin_required
+def delete_subject(subject_id):
+    Subject.query.get_or_404(subject_id)
+    deletion.delete_subjects([subject_id], batch_size=current_app.config['DELETE_BATCH_SIZE'])
+    return redirect(url_for('main.admin_dashboard'))
+
+@bp.route('/quiz/delete/<int:quiz_id>', methods=['POST'])
+@admin_required
+def delete_quiz(quiz_id):
+    Quiz.query.get_or_404(quiz_id)
+    deletion.delete_quizzes([quiz_id], batch_size=current_app.config['DELETE_BATCH_SIZE'])
+    return redirect(url_for('main.quiz_management'))
+
+@bp.route('/question/edit/<int:question_id>', methods=['POST'])
+@admin_required
+def edit_question(question_id):
+    question = Question.query.get_or_404(question_id)
+    question.question_title = request.form['question_title']
+    question.question_statement = request.form['question_statement']
+    try:
+        options, question.correct_mask = read_options(request.form)
+    except ValueError as e:
+        db.session.rollback()
+        flash(f'Error editing question: {e}', 'danger')
+        return redirect(url_for('main.quiz_management'))
+    question.set_options(options)
+    catalog.bump()
+    db.session.commit()
+    quiz_cache.invalidate(question.quiz_id)
+    return redirect(url_for('main.quiz_management'))
+
+@bp.route('/question/delete/<int:question_id>', methods=['POST'])
+@admin_required
+def delete_question(question_id):
+    question = Question.query.get_or_404(question_id)
+    quiz_id = question.quiz_id
+    db.session.delete(question)
+    stats.adjust_question_count(quiz_id, -1)
+    catalog.bump()
+    db.session.commit()
+    quiz_cache.invalidate(quiz_id)
+    return redirect(url_for('main.quiz_management'))
+
+@bp.route('/admin/questions/import', methods=['POST'])
+@admin_required(api=True)
+def import_questions():
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'Upload a CSV or JSONL file as "file".'}), 400
+
+    fmt = request.form.get('format') or bulk_io.format_for(upload.filename)
+    lines = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    try:
+        result = bulk_io.import_questions(lines, fmt, chunk_size=current_app.config['BULK_IMPORT_CHUNK_SIZE'])
+    except (bulk_io.BulkIOError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'imported': result.imported,
+        'rejected': result.rejected,
+        'errors': [{'line': line, 'error': error} for line, error in result.errors],
+        'quiz_ids': result.quiz_ids,
+        'seconds': round(result.seconds, 3)
+    })
+
+@bp.route('/admin/export/<kind>.<fmt>')
+@admin_required
+def export_data(kind, fmt):
+    try:
+        chunks = bulk_io.export_lines(kind, fmt, quiz_id=request.args.get('quiz_id', type=int))
+    except bulk_io.BulkIOError as e:
+        return jsonify({'error': str(e)}), 404
+
+    response = current_app.response_class(
+        stream_with_context(chunks), mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={kind}.{fmt}'
+    return response
+
+@bp.route('/search')
+@admin_required
+def search():
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind')
+    page = max(request.args.get('page', 1, type=int), 1)
+    kinds = [kind] if kind in search_index.KINDS else None
+    hits, has_next = search_index.search(query, page, current_app.config['SEARCH_PAGE_SIZE'], kinds) if query else ([], False)
+    return render_template('search.html', query=query, kind=kind if kinds else None, page=page,
+                           hits=hits, has_next=has_next, kinds=list(search_index.KINDS))
+
+@bp.route('/admin/runtime_stats')
+@admin_required(api=True)
+def runtime_stats():
+    return jsonify({
+        'quiz_cache': quiz_cache.stats(),
+        'catalog': catalog.stats(),
+        'leaderboard': leaderboard.stats(),
+        'score_archive': score_archive.stats(),
+        'score_writer': score_writer.metrics(),
+        'credentials': credentials.metrics()
+    })
+
+@bp.route('/admin/slow_queries')
+@admin_required(api=True)
+def slow_queries():
+    return jsonify(instrumentation.metrics.slow_log())
+
+@bp.route('/metrics')
+def metrics():
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return 'Unauthorized\n', 401
+
+    gauges = {f'quiz_cache_{key}': value for key, value in quiz_cache.stats().items()}
+    gauges.update({f'quiz_catalog_{key}': value for key, value in catalog.stats().items()})
+    gauges.update({f'quiz_leaderboard_{key}': value for key, value in leaderboard.stats().items()})
+    gauges.update({f'quiz_score_archive_{key}': value for key, value in score_archive.stats().items()})
+    gauges.update({
+        f'quiz_score_writer_{key}': int(value) if isinstance(value, bool) else value
+        for key, value in score_writer.metrics().items()
+    })
+    gauges.update({
+        f'quiz_credentials_{key}': value
+        for key, value in credentials.metrics().items() if not isinstance(value, str)
+    })
+    response = make_response(instrumentation.metrics.render(gauges))
+    response.mimetype = 'text/plain'
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
+
+@bp.route('/logout')
+def logout():
+    logout_user()
+    flash('Logged out successfully!', 'info')
+    return redirect(url_for('main.login'))